@@ -1,185 +1,405 @@
 # app.py - Modular Flask Application for Markdown Reader
 # ======================================================
 
+import atexit
+import itertools
+import multiprocessing
 import os
-import re
-from datetime import datetime
-from flask import Flask, render_template, abort, jsonify, request, url_for
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from flask import (Flask, Response, render_template, abort, g, has_request_context, jsonify, make_response,
+                   redirect, request, stream_template, stream_with_context, url_for)
+from markupsafe import Markup, escape
+from werkzeug.http import is_resource_modified
 import markdown
 from markdown.extensions.toc import TocExtension
 from markdown.extensions import codehilite, fenced_code, tables
+from catalog import DocumentCatalog, FileInfo, format_file_size, format_datetime, read_digests, read_stats
+from catalog_store import CatalogStore
+from render_cache import RenderCache, config_digest, tree_digest
+from converter_pool import ConverterPool
+from search_index import SearchIndex
+from text_stats import (READING_SPEED_CJK, READING_SPEED_LATIN, cached_text_stats, get_text_stats,
+                        calculate_reading_time, count_words)
+from sections import build_outline, get_outline, section_source
+from rendering import (MARKDOWN_EXTENSIONS, MARKDOWN_EXTENSION_CONFIGS, create_markdown_converter,
+                       init_worker, render_document)
+from watcher import DocsWatcher
+from stylesheet import StylesheetCompiler
+from compression import COMPRESSIBLE_MIMETYPES, StreamCompressor, compress, negotiate_encoding
+from metrics import MetricsRegistry
+
+# Pygmentsがない環境ではcodehiliteはハイライトしない
+try:
+    from pygments import __version__ as PYGMENTS_VERSION
+except ImportError:
+    PYGMENTS_VERSION = None
 
 # Flaskアプリケーションを作成します
 app = Flask(__name__)
+# 静的サイトの書き出し中か（サーバーのAPIを使う機能をページに含めない）
+app.config['STATIC_EXPORT'] = False
 
 # 設定
 DOCS_DIR = '.'
-READING_SPEED_CJK = 400  # 日本語読書速度（文字/分）
-READING_SPEED_LATIN = 200  # 英語読書速度（語/分）
-
-class FileInfo:
-    """ファイル情報を保持するクラス"""
-    def __init__(self, path, name, content='', size='', modified=''):
-        self.path = path
-        self.name = name
-        self.content = content
-        self.size = size
-        self.modified = modified
-        self.stats = {
-            'size': size,
-            'modified': modified
-        } if size or modified else None
-
-def format_file_size(size_bytes):
-    """ファイルサイズを人間が読みやすい形式に変換"""
-    if size_bytes < 1024:
-        return f"{size_bytes} B"
-    elif size_bytes < 1024 * 1024:
-        return f"{size_bytes // 1024} KB"
-    else:
-        return f"{size_bytes // (1024 * 1024)} MB"
+CATALOG_REVALIDATE_INTERVAL = 1.0  # カタログ再検証の最小間隔（秒）
+SCAN_WORKERS = 4  # ディレクトリの探索と本文の読み込みを並行して行うスレッド数（1で逐次）
+CATALOG_SNAPSHOT = os.path.join('.cache', 'catalog.sqlite3')  # カタログのスナップショットの保存先（Noneで無効）
+RENDER_CACHE_MAX_ENTRIES = 512  # 変換済みHTMLキャッシュの最大エントリ数
+RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 変換済みHTMLキャッシュの最大バイト数
+RENDER_CACHE_DIR = None  # ディスクキャッシュの保存先（例: '.cache/render'、Noneで無効）
+CONVERTER_POOL_SIZE = 8  # 待機させておくMarkdownコンバーターの最大数
+SEARCH_DEFAULT_LIMIT = 20  # 検索結果のデフォルト件数
+SEARCH_MAX_LIMIT = 100  # 1リクエストで返す検索結果の最大件数
+WATCH_DOCS = True  # ドキュメントの変更を監視してカタログへ反映する
+WATCH_DEBOUNCE = 0.5  # 変更イベントをまとめる待ち時間（秒）
+RENDER_WORKERS = 0  # 一括変換に使うプロセス数（0で無効、Noneでコア数）
+RENDER_PREFETCH = 2  # ワーカー1つあたりに先行して渡すドキュメント数
+COMPRESS_RESPONSES = True  # Accept-Encodingに応じてgzip/brotliで圧縮して返す
+COMPRESSION_MIN_SIZE = 1024  # これより小さい本文は圧縮しない（バイト）
+COMPRESSION_GZIP_LEVEL = 9  # gzipの圧縮レベル（1-9）
+COMPRESSION_BROTLI_QUALITY = 9  # brotliの圧縮品質（0-11）
+SCSS_OUTPUT_STYLE = None  # CSSの出力形式（Noneの場合はデバッグ時expanded、それ以外はcompressed）
+SCSS_CACHE_DIR = os.path.join('.cache', 'scss')  # コンパイル済みCSSの保存先（Noneで無効）
+STYLESHEET_MAX_AGE = 365 * 24 * 60 * 60  # ハッシュ付きCSSのキャッシュ期間（秒）
+ERROR_PAGE_TIME_BUDGET = 0.05  # エラーページの描画にかける時間の目安（秒）
+ERROR_PAGE_DEGRADED_SECONDS = 30.0  # 目安を超えた後に最小限のエラーページで応答する時間（秒）
+LARGE_FILE_THRESHOLD = 2 * 1024 * 1024  # これより大きなファイルは分割して表示する（バイト）
+LARGE_FILE_CHUNK_BYTES = 512 * 1024  # 大きなファイルを1ページに表示する最大バイト数
+SEARCH_INDEX_MAX_BYTES = 1024 * 1024  # 1ファイルあたりの検索対象の最大バイト数（Noneで無制限）
+LARGE_FILE_WARNING_LIMIT = 100  # 保持する大きなファイルの警告の件数
+LAZY_SECTIONS_MIN_BYTES = 256 * 1024  # これより大きなファイルは見出しの一覧を先に返し、セクションを遅延して読み込む（Noneで無効）
+METRICS_ENABLED = True  # 処理段階ごとの時間の計測と/metricsを有効にする
+SERVER_TIMING_ENABLED = True  # 計測した時間をServer-Timingヘッダーで返す（METRICS_ENABLEDの場合のみ）
+
+# ルートと処理段階ごとの所要時間
+metrics = MetricsRegistry()
+
+@contextmanager
+def timed_phase(name):
+    """
+    with内の処理時間を、このリクエストの段階nameの時間に加算します。
+    計測が無効な場合やリクエストの外では何もしません。
+    段階は入れ子になることがあります（convertはhighlightを含みます）。
+    """
+    timings = g.get('phase_timings') if METRICS_ENABLED and has_request_context() else None
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+# Pygmentsによるハイライトの時間も段階として計測する
+if codehilite.pygments:
+    _pygments_highlight = codehilite.highlight
+    
+    def timed_highlight(*args, **kwargs):
+        with timed_phase('highlight'):
+            return _pygments_highlight(*args, **kwargs)
+    
+    codehilite.highlight = timed_highlight
+
+# プロセス全体で共有するドキュメントカタログ
+# 起動時はスナップショットから復元し、同じホストのワーカー間でも共有する
+catalog_store = CatalogStore(CATALOG_SNAPSHOT) if CATALOG_SNAPSHOT else None
+catalog = DocumentCatalog(DOCS_DIR, revalidate_interval=CATALOG_REVALIDATE_INTERVAL, scan_workers=SCAN_WORKERS,
+                          store=catalog_store)
+if catalog_store is not None and multiprocessing.parent_process() is None:
+    # 実行中に計算したダイジェストと統計情報も次回の起動で使えるよう保存する
+    atexit.register(catalog.save_snapshot)
+
+# 大きなファイルを分割・省略して扱った記録 ((パス, 処理) → 内容)
+large_file_warnings = OrderedDict()
+_large_file_lock = threading.Lock()
+
+def is_large_file(file_info):
+    """分割して表示するファイルか判定"""
+    return file_info.size_bytes > LARGE_FILE_THRESHOLD
+
+def warn_large_file(file_info, action):
+    """
+    大きなファイルを分割・省略して扱ったことを記録します。
+    警告の表示は同じ内容のファイルと処理の組ごとに1回だけです。
+    """
+    key = (file_info.path, action)
+    with _large_file_lock:
+        previous = large_file_warnings.pop(key, None)
+        large_file_warnings[key] = {
+            'path': file_info.path,
+            'action': action,
+            'size_bytes': file_info.size_bytes,
+            'mtime_ns': file_info.mtime_ns,
+            'count': previous['count'] + 1 if previous is not None else 1
+        }
+        while len(large_file_warnings) > LARGE_FILE_WARNING_LIMIT:
+            large_file_warnings.popitem(last=False)
+    
+    if previous is None or previous['mtime_ns'] != file_info.mtime_ns:
+        print(f"Warning: Large file {file_info.path} ({format_file_size(file_info.size_bytes)}) "
+              f"is only partially handled for {action}")
+
+# 全文検索用の転置インデックス（カタログから差分更新する）
+search_index = SearchIndex(
+    max_document_bytes=SEARCH_INDEX_MAX_BYTES,
+    on_truncate=lambda file_info: warn_large_file(file_info, 'index')
+)
+
+def on_docs_changed():
+    """監視スレッドで変更を反映した後に、派生データを更新する"""
+    # 構築済みの検索インデックスは変更分だけ先に同期しておく
+    if search_index.synced_version is not None:
+        search_index.sync(catalog.get_files(), catalog.version)
 
-def format_datetime(timestamp):
-    """タイムスタンプを人間が読みやすい形式に変換"""
-    dt = datetime.fromtimestamp(timestamp)
-    return dt.strftime('%Y-%m-%d %H:%M')
+# ドキュメントの監視（有効な間はリクエストごとのstatを行わない）
+# 読み込み時には開始せず、リクエストを処理するプロセスごとに最初のリクエストで開始する
+# （gunicorn --preloadなどでフォークしたワーカーには監視スレッドが引き継がれないため）
+docs_watcher = DocsWatcher(catalog, debounce=WATCH_DEBOUNCE, on_change=on_docs_changed)
 
 def get_md_files_structure():
     """
-    ディレクトリを再帰的に探索し、.mdファイルの情報をリストで取得します。
-    ファイル名のプレフィックスはソートにのみ使用し、表示用の名前からは除去します。
+    .mdファイルの情報をリストで取得します。
+    カタログがstat情報で変更を検知した場合のみディレクトリを再探索します。
+    """
+    with timed_phase('walk'):
+        return catalog.get_files()
+
+# 変換済みHTMLのキャッシュ
+render_cache = RenderCache(
+    max_entries=RENDER_CACHE_MAX_ENTRIES,
+    max_bytes=RENDER_CACHE_MAX_BYTES,
+    cache_dir=RENDER_CACHE_DIR
+)
+# codehiliteのハイライト結果はPygmentsのバージョンでも変わる
+RENDER_CONFIG_KEY = config_digest(markdown.__version__, PYGMENTS_VERSION, MARKDOWN_EXTENSIONS, MARKDOWN_EXTENSION_CONFIGS)
+
+# 構築済みコンバーターのプール（リクエストごとに貸し出す）
+converter_pool = ConverterPool(create_markdown_converter, max_idle=CONVERTER_POOL_SIZE)
+
+# テンプレートか変換設定が変わればページのETagも変わる
+PAGE_CONFIG_KEY = config_digest(RENDER_CONFIG_KEY, tree_digest(app.template_folder))
+
+# 直近のファイル一覧とそのバリデーター
+_listing_validators = (None, None)
+
+def listing_validators(files):
+    """
+    ファイル一覧のダイジェストと最新の更新時刻（ナノ秒）を返します。
+    更新時刻にはディレクトリの更新時刻も含めるため、ファイルの削除やリネームでも進みます。
+    カタログは変更がなければ同じリストを返すため、一覧ごとに1回だけ計算します。
     """
-    md_files_info = []
+    global _listing_validators
+    cached_files, validators = _listing_validators
+    if cached_files is files:
+        return validators
     
-    for root, dirs, files in os.walk(DOCS_DIR, topdown=True):
-        # 除外するディレクトリ
-        excluded_dirs = ['.venv', '__pycache__', '.git', 'node_modules', 'static', 'templates']
-        dirs[:] = [d for d in dirs if d not in excluded_dirs]
-        
-        dirs.sort()
-        files.sort()
-        
-        depth = root.count(os.sep) if root != '.' else 0
-        
-        for filename in files:
-            if filename.endswith('.md'):
-                # 接頭辞に番号がついていない場合はスキップ
-                match = re.match(r'^\d+_', filename)
-                if not match:
-                    continue
-                    
-                full_path = os.path.join(root, filename)
-                
-                try:
-                    # ファイル情報を取得
-                    stat_info = os.stat(full_path)
-                    file_size = format_file_size(stat_info.st_size)
-                    modified_time = format_datetime(stat_info.st_mtime)
-                    
-                    # ファイル内容を読み込み
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # 表示用のファイル名（接頭辞を除去）
-                    clean_name = filename[len(match.group(0)):].replace('.md', '')
-                    
-                    # ソート用のキーを生成
-                    sort_key = []
-                    path_parts = full_path.replace(DOCS_DIR, '').strip('/').split('/')
-                    for part in path_parts:
-                        if part.endswith('.md'):
-                            match = re.match(r'^(\d+)_', part)
-                            sort_key.append(int(match.group(1)) if match else 999)
-                        else:
-                            match = re.match(r'^(\d+)_', part)
-                            sort_key.append(int(match.group(1)) if match else 999)
-                    
-                    # 相対パス（URLで使用）
-                    relative_path = os.path.relpath(full_path, DOCS_DIR)
-                    
-                    file_info = FileInfo(
-                        path=relative_path,  # 相対パスを使用
-                        name=clean_name,
-                        content=content,
-                        size=file_size,
-                        modified=modified_time
-                    )
-                    
-                    md_files_info.append({
-                        'file_info': file_info,
-                        'sort_key': sort_key,
-                        'depth': depth
-                    })
-                    
-                except (IOError, OSError) as e:
-                    print(f"Warning: Could not read file {full_path}: {e}")
-                    continue
-    
-    # ソート
-    md_files_info.sort(key=lambda x: x['sort_key'])
-    
-    # FileInfoオブジェクトのみを返す
-    return [item['file_info'] for item in md_files_info]
-
-def calculate_reading_time(content):
-    """コンテンツの推定読書時間を計算"""
-    # CJK文字（中国語、日本語、韓国語）をカウント
-    cjk_chars = len(re.findall(r'[\u4e00-\u9fff\u3400-\u4dbf\u3040-\u309f\u30a0-\u30ff]', content))
-    
-    # 英語の単語をカウント
-    latin_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
-    
-    # 読書時間を計算（分）
-    cjk_time = cjk_chars / READING_SPEED_CJK
-    latin_time = latin_words / READING_SPEED_LATIN
-    
-    total_time = cjk_time + latin_time
-    return max(1, round(total_time))
-
-def count_words(content):
-    """コンテンツの単語数をカウント"""
-    # CJK文字をカウント
-    cjk_chars = len(re.findall(r'[\u4e00-\u9fff\u3400-\u4dbf\u3040-\u309f\u30a0-\u30ff]', content))
-    
-    # 英語の単語をカウント  
-    latin_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
-    
-    # CJK文字は1文字を1語として計算
-    return cjk_chars + latin_words
+    validators = (
+        config_digest([(f.path, f.name, f.size_bytes, f.mtime_ns) for f in files]),
+        max(max((f.mtime_ns for f in files), default=0), catalog.modified_ns)
+    )
+    _listing_validators = (files, validators)
+    return validators
 
-def process_markdown(content):
-    """Markdownコンテンツを処理してHTMLに変換"""
-    # Markdown拡張機能を設定
-    extensions = [
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.toc',
-        'markdown.extensions.attr_list',
-        'markdown.extensions.def_list',
-        'markdown.extensions.abbr',
-        'markdown.extensions.footnotes',
-        'markdown.extensions.md_in_html'
-    ]
+def document_digests(files):
+    """各ファイルの本文のダイジェストを返す（読み込めないファイルはNone、未計算の分は並行して読み込む）"""
+    return read_digests(files, SCAN_WORKERS)
+
+def http_date(mtime_ns):
+    """Last-Modified用の日時に変換"""
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc) if mtime_ns else None
+
+def response_encoding():
+    """このリクエストに対するレスポンスの圧縮方式（圧縮しない場合はNone）"""
+    if not COMPRESS_RESPONSES:
+        return None
+    return negotiate_encoding(request.accept_encodings)
+
+def representation_etag(etag):
+    """圧縮方式ごとに本文が異なるため、ETagにもエンコーディングを付ける"""
+    encoding = response_encoding()
+    return f'{etag}-{encoding}' if encoding else etag
+
+def conditional_response(etag, mtime_ns):
+    """
+    If-None-Match / If-Modified-Since がETag・更新時刻と一致すれば
+    304レスポンスを返します（一致しなければNone）。
+    """
+    if is_resource_modified(request.environ, etag=representation_etag(etag), last_modified=http_date(mtime_ns)):
+        return None
+    return with_validators(Response(status=304), etag, mtime_ns)
+
+def with_validators(response, etag, mtime_ns):
+    """レスポンスにETagとLast-Modifiedを設定（キャッシュは毎回再検証させる）"""
+    response = make_response(response)
+    response.set_etag(representation_etag(etag))
+    response.last_modified = http_date(mtime_ns)
+    response.cache_control.no_cache = True
+    if COMPRESS_RESPONSES:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def compression_level(encoding):
+    return COMPRESSION_BROTLI_QUALITY if encoding == 'br' else COMPRESSION_GZIP_LEVEL
+
+def compress_stream(response, encoding, cache_key):
+    """
+    ストリーミングレスポンスをチャンクごとに圧縮します。
+    最後まで送信できた場合は圧縮結果をキャッシュし、次回からはそのまま返します。
+    """
+    chunks = response.iter_encoded()
     
-    extension_configs = {
-        'markdown.extensions.codehilite': {
-            'css_class': 'highlight',
-            'use_pygments': True
-        },
-        'markdown.extensions.toc': {
-            'permalink': True,
-            'permalink_class': 'toc-link',
-            'permalink_title': 'Permalink to this heading'
-        }
-    }
+    def generate():
+        compressor = StreamCompressor(encoding, compression_level(encoding))
+        compressed = []
+        for chunk in chunks:
+            data = compressor.write(chunk)
+            compressed.append(data)
+            yield data
+        data = compressor.close()
+        compressed.append(data)
+        yield data
+        if cache_key is not None:
+            render_cache.put_variant(cache_key, encoding, b''.join(compressed))
     
-    md = markdown.Markdown(
-        extensions=extensions,
-        extension_configs=extension_configs
+    response.response = generate()
+    return response
+
+@app.before_request
+def start_request_timing():
+    """リクエストごとの段階の時間を記録する準備"""
+    if METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+        g.phase_timings = {}
+
+@app.before_request
+def start_docs_watcher():
+    """このプロセスでドキュメントの監視をまだ開始していなければ開始する"""
+    if WATCH_DOCS:
+        docs_watcher.ensure_started()
+
+@app.after_request
+def record_request_timing(response):
+    """
+    段階ごとの時間をServer-Timingヘッダーに設定し、送信が終わった時点でメトリクスに記録します。
+    ストリーミングのレスポンスでは、ヘッダーには送信開始までの時間だけが含まれます。
+    （after_requestは登録と逆順に呼ばれるため、圧縮の時間もここに含まれます）
+    """
+    timings = g.get('phase_timings')
+    if timings is None:
+        return response
+    
+    started = g.request_started
+    if SERVER_TIMING_ENABLED:
+        entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.items()]
+        entries.append(f'total;dur={(time.perf_counter() - started) * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    
+    route = request.endpoint or 'unmatched'
+    status = response.status_code
+    response.call_on_close(
+        lambda: metrics.observe_request(route, status, time.perf_counter() - started, timings)
     )
+    return response
+
+@app.after_request
+def compress_response(response):
+    """
+    Accept-Encodingに応じて本文を圧縮します。
+    ETagのある応答は圧縮済みの本文をETagごとにキャッシュするため、同じ内容の圧縮は1回だけです。
+    ETagのない応答は毎回内容が変わりうるため、キャッシュせずに圧縮します。
+    """
+    if (not COMPRESS_RESPONSES or response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
     
-    html_content = md.convert(content)
+    response.vary.add('Accept-Encoding')
+    encoding = response_encoding()
+    if encoding is None:
+        return response
+    
+    etag, _ = response.get_etag()
+    if response.is_streamed:
+        cached = render_cache.get_variant(etag, encoding) if etag else None
+        if cached is None:
+            response = compress_stream(response, encoding, etag)
+        else:
+            # 変換前のジェネレーターは使わずに閉じる
+            response.close()
+            response.set_data(cached)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        cached = render_cache.get_variant(etag, encoding) if etag else None
+        if cached is None:
+            with timed_phase('compress'):
+                cached = compress(data, encoding, compression_level(encoding))
+            if etag:
+                render_cache.put_variant(etag, encoding, cached)
+        response.set_data(cached)
+    
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# SCSSは.scssファイルが変わったときだけコンパイルする
+stylesheet_compiler = StylesheetCompiler(
+    os.path.join(app.static_folder, 'scss'),
+    cache_dir=SCSS_CACHE_DIR,
+    revalidate_interval=CATALOG_REVALIDATE_INTERVAL
+)
+
+def get_stylesheet():
+    """コンパイル済みのCSSを返す"""
+    output_style = SCSS_OUTPUT_STYLE or ('expanded' if app.debug else 'compressed')
+    return stylesheet_compiler.get(output_style)
+
+@app.template_global()
+def stylesheet_url():
+    """内容のハッシュ付きのCSSのURL"""
+    return url_for('hashed_stylesheet', digest=get_stylesheet().digest)
+
+# 直近に描画したサイドバーのファイル一覧 (ファイル一覧, script_root, HTML)
+_sidebar_cache = (None, None, None)
+
+@app.template_global()
+def sidebar_nav(files, current_file=None):
+    """
+    サイドバーのファイル一覧のHTMLを返します。
+    一覧の描画はファイル一覧ごとに1回だけ行い、ページごとには
+    選択中の項目のclassとaria-currentだけを書き換えます。
+    """
+    global _sidebar_cache
+    cached_files, script_root, html = _sidebar_cache
+    if cached_files is not files or script_root != request.script_root:
+        html = render_template('_sidebar_nav.html', files=files)
+        _sidebar_cache = (files, request.script_root, html)
+    
+    if current_file is not None:
+        start = html.find(f'href="{escape(url_for("view_file", file_path=current_file.path))}"')
+        if start != -1:
+            end = html.find('>', start)
+            tag = html[start:end].replace('class="sidebar-nav-item"', 'class="sidebar-nav-item active"', 1)
+            tag = tag.replace('aria-current="false"', 'aria-current="page"', 1)
+            html = html[:start] + tag + html[end:]
+    return Markup(html)
+
+def process_markdown(content):
+    """Markdownコンテンツを処理してHTMLに変換（変換結果はキャッシュする）"""
+    cache_key = render_cache.make_key(content, RENDER_CONFIG_KEY)
+    html_content = render_cache.get(cache_key)
+    if html_content is not None:
+        return html_content
+    
+    with timed_phase('convert'), converter_pool.converter() as md:
+        html_content = md.convert(content)
+    render_cache.put(cache_key, html_content)
     return html_content
 
 @app.route('/')
@@ -201,11 +421,231 @@ def index():
         'reading_time': None
     }
     
-    return render_template('index.html', **context)
+    with timed_phase('render'):
+        return render_template('index.html', **context)
+
+# 一括変換用のプロセスプール（最初に使うときに作成）
+_render_executor = None
+_render_executor_lock = threading.Lock()
+
+def get_render_executor():
+    """一括変換用のProcessPoolExecutorを返す（無効な場合はNone）"""
+    global _render_executor
+    if RENDER_WORKERS == 0:
+        return None
+    with _render_executor_lock:
+        if _render_executor is None:
+            # ワーカーはapp.pyではなくrenderingモジュールだけを読み込む
+            _render_executor = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker
+            )
+        return _render_executor
+
+def discard_render_executor(executor):
+    """
+    ワーカーが異常終了して使えなくなったプロセスプールを破棄します。
+    次に一括変換するときに新しいプールを作成します。
+    """
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is not executor:
+            return
+        _render_executor = None
+    print("Warning: A render worker exited unexpectedly; restarting the process pool")
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def submit_render(executor, file):
+    """
+    ファイルを読み込んで変換を依頼し、((HTML, 単語数, 読書時間) のFuture, 続きの位置) を返します。
+    キャッシュ済みの場合やプロセスプールが無効な場合はこのプロセスで処理します。
+    大きなファイルは先頭の部分だけを変換し、続きの位置を返します（それ以外はNone）。
+    ファイルが存在しない場合の結果はNoneです。
+    """
+    future = Future()
+    next_offset = None
+    try:
+        # ファイル内容を読み込み
+        file_path = os.path.join(DOCS_DIR, file.path)
+        
+        if not os.path.exists(file_path):
+            future.set_result(None)
+            return future, None
+        
+        with timed_phase('read'):
+            if is_large_file(file):
+                content, next_offset = file.read_chunk(0, LARGE_FILE_CHUNK_BYTES)
+                warn_large_file(file, 'render')
+            else:
+                content = file.read_content()
+        
+        cache_key = render_cache.make_key(content, RENDER_CONFIG_KEY)
+        html_content = render_cache.get(cache_key)
+        if html_content is None and executor is not None:
+            def store(done):
+                # ワーカーの変換結果をこのプロセスのキャッシュに保存
+                if done.exception() is None:
+                    render_cache.put(cache_key, done.result()[0])
+            
+            remote = executor.submit(render_document, content)
+            remote.add_done_callback(store)
+            return remote, next_offset
+        
+        if html_content is None:
+            html_content = process_markdown(content)
+        with timed_phase('stats'):
+            stats = get_text_stats(content)
+        future.set_result((html_content, stats.word_count, stats.reading_time))
+    except Exception as e:
+        future.set_exception(e)
+    return future, next_offset
+
+def continuation_url(file_info, offset):
+    """
+    大きなファイルのoffsetバイト目からの続きのURL。
+    静的サイトでは `?offset=` を使えないため、続きごとに書き出したページ（`<ファイルのURL>.part-<offset>`）を指します。
+    """
+    if app.config['STATIC_EXPORT']:
+        return url_for('view_file', file_path=file_info.path) + f'.part-{offset}'
+    return url_for('view_file', file_path=file_info.path, offset=offset)
+
+def continuation_html(file_info, next_offset):
+    """大きなファイルの続きを読み込むリンク（続きがなければ空文字列）"""
+    if next_offset is None:
+        return ''
+    url = continuation_url(file_info, next_offset)
+    return (f'<div class="load-more"><p>Showing {next_offset * 100 // max(file_info.size_bytes, 1)}% '
+            f'of {file_info.size}.</p><a class="load-more-link" href="{escape(url)}">Load more</a></div>')
+
+def document_outline(file_info):
+    """
+    ドキュメントの見出しの索引を返します（内容のダイジェストごとにキャッシュする）。
+    UTF-8として読めないファイルは400を返します。
+    """
+    def build():
+        with timed_phase('outline'), converter_pool.converter() as md:
+            return build_outline(file_info.iter_lines(), md)
+
+    try:
+        return get_outline(file_info.digest, build)
+    except UnicodeDecodeError:
+        abort(400)
+
+def render_section(file_info, outline, first_line, start, end):
+    """
+    本文のstartからendバイト目の手前まで（first_line行目から）を変換してHTMLを返します。
+    大きなファイルで範囲がLARGE_FILE_CHUNK_BYTESを超える場合は先頭だけを変換し、続きへのリンクを付けます。
+    """
+    next_offset = None
+    try:
+        with timed_phase('read'):
+            if is_large_file(file_info) and end - start > LARGE_FILE_CHUNK_BYTES:
+                text, next_offset = file_info.read_chunk(start, LARGE_FILE_CHUNK_BYTES)
+            else:
+                text = file_info.read_range(start, end)
+    except ValueError:
+        abort(400)
+    if next_offset is not None:
+        warn_large_file(file_info, 'section')
+        end = next_offset
+
+    source = section_source(outline, text, first_line, outline.headings_between(start, end))
+    return process_markdown(source) + continuation_html(file_info, next_offset)
+
+def use_lazy_sections(file_info):
+    """見出しごとにセクションを遅延して読み込む表示にするか（?sections=lazy/allで切り替えられる）"""
+    mode = request.args.get('sections')
+    if mode == 'all':
+        return False
+    return mode == 'lazy' or (LAZY_SECTIONS_MIN_BYTES is not None and file_info.size_bytes > LAZY_SECTIONS_MIN_BYTES)
+
+def lazy_sections_html(file_info, outline):
+    """
+    最初の見出しのセクションまでを変換し、残りは見出しだけの枠を返します。
+    枠の中身はスクロールで表示される前にsections.jsがセクションのAPIから読み込みます。
+    """
+    first = outline.headings[0]
+    full_url = url_for('view_file', file_path=file_info.path, sections='all')
+    parts = [
+        f'<p class="lazy-sections-note">Sections load as you scroll. '
+        f'<a href="{escape(full_url)}">Show the whole document</a></p>',
+        render_section(file_info, outline, 1, 0, first.end)
+    ]
+    # 見出しが多いドキュメントでも小さく収まるよう、URLは共通部分を1回だけ出力する
+    base_url = url_for('api_file_section', file_path=file_info.path, slug='')
+    parts.append(f'<div class="lazy-sections" data-section-base="{escape(base_url)}">')
+    for heading in outline.headings[1:]:
+        slug = escape(heading.slug)
+        parts.append(f'<section class="lazy-section" data-section="{slug}">'
+                     f'<h{heading.level} id="{slug}">{escape(heading.title)}</h{heading.level}></section>')
+    parts.append('</div>')
+    return ''.join(parts)
+
+def iter_rendered_documents(files, executor):
+    """
+    ファイルを変換し (FileInfo, Future, 続きの位置) を元の順序で返すジェネレーター。
+    executorがプロセスプールの場合は先読みして複数のファイルを並列に変換します（Noneならこのプロセスで変換）。
+    """
+    window = (RENDER_WORKERS or os.cpu_count() or 1) * RENDER_PREFETCH if executor is not None else 1
+    pending = deque()
+    for file in files:
+        pending.append((file, *submit_render(executor, file)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def iter_all_sections(files, totals):
+    """
+    一枚綴り表示の各ドキュメントセクションのHTMLを順に生成します。
+    単語数と読書時間の合計はtotalsに加算していきます。
+    ワーカーが異常終了した場合、残りのファイルはこのプロセスで変換し、プールは次のリクエストで作り直します。
+    """
+    executor = get_render_executor()
+    for i, (file, future, next_offset) in enumerate(iter_rendered_documents(files, executor), 1):
+        try:
+            # ワーカーでの変換を待つ時間も変換の段階に含める
+            with timed_phase('convert'):
+                try:
+                    rendered = future.result()
+                except BrokenProcessPool:
+                    # 次のリクエストでは新しいプールを使う
+                    discard_render_executor(executor)
+                    rendered = submit_render(None, file)[0].result()
+            if rendered is None:
+                continue
+            html_content, word_count, reading_time = rendered
+            
+            # セクション区切りを追加
+            section_header = f'<div class="document-section" data-file="{file.path}">'
+            section_header += f'<h1 class="section-title">{i}. {file.name}</h1>'
+            section_header += f'<div class="section-meta">File: {file.path}</div>'
+            
+            # 統計情報を計算
+            totals['word_count'] += word_count
+            totals['reading_time'] += reading_time
+            
+            # セクションとして追加
+            section = [section_header, html_content + continuation_html(file, next_offset), '</div>']
+            
+            # セクション間の区切り
+            if i < len(files):
+                section.append('<hr class="section-divider">')
+            
+            yield '\n'.join(section)
+                
+        except Exception as e:
+            # エラーハンドリング
+            yield f'<div class="error-section"><p>Error loading {file.name}: {str(e)}</p></div>'
 
 @app.route('/all')
 def view_all():
-    """すべてのMarkdownファイルを一枚綴りで表示"""
+    """
+    すべてのMarkdownファイルを一枚綴りで表示
+    ページの外枠とサイドバーを先に送り、各セクションは変換でき次第送信します。
+    ?stream=0 の場合はすべて変換してから一度に返します。
+    """
     files = get_md_files_structure()
     
     if not files:
@@ -223,105 +663,120 @@ def view_all():
             'view_mode': 'all'
         })
     
-    # すべてのファイルの内容を結合
-    combined_content = []
-    total_word_count = 0
-    total_reading_time = 0
-    
-    for i, file in enumerate(files, 1):
-        try:
-            # ファイル内容を読み込み
-            file_path = os.path.join(DOCS_DIR, file.path)
-            
-            if not os.path.exists(file_path):
-                continue
-                
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # セクション区切りを追加
-            section_header = f'<div class="document-section" data-file="{file.path}">'
-            section_header += f'<h1 class="section-title">{i}. {file.name}</h1>'
-            section_header += f'<div class="section-meta">File: {file.path}</div>'
-            
-            # MarkdownをHTMLに変換
-            html_content = process_markdown(content)
-            
-            # 統計情報を計算
-            word_count = count_words(content)
-            reading_time = calculate_reading_time(content)
-            
-            total_word_count += word_count
-            total_reading_time += reading_time
-            
-            # セクションとして追加
-            combined_content.append(section_header)
-            combined_content.append(html_content)
-            combined_content.append('</div>')
-            
-            # セクション間の区切り
-            if i < len(files):
-                combined_content.append('<hr class="section-divider">')
-                
-        except Exception as e:
-            # エラーハンドリング
-            error_content = f'<div class="error-section"><p>Error loading {file.name}: {str(e)}</p></div>'
-            combined_content.append(error_content)
+    # 変換前に条件付きリクエストを確認（ストリーミングの有無で本文が異なる）
+    listing_digest, newest_mtime_ns = listing_validators(files)
+    with timed_phase('read'):
+        digests = document_digests(files)
+    etag = config_digest(PAGE_CONFIG_KEY, get_stylesheet().digest, listing_digest, digests,
+                         request.args.get('stream'))
+    not_modified = conditional_response(etag, newest_mtime_ns)
+    if not_modified is not None:
+        return not_modified
     
-    # 結合されたコンテンツ
-    final_content = '\n'.join(combined_content)
+    totals = {'word_count': 0, 'reading_time': 0}
+    sections = iter_all_sections(files, totals)
     
     # 仮想ファイル情報を作成
     virtual_file = FileInfo(
         path='all',
-        name='All Documents (Combined View)',
-        content=final_content
+        name='All Documents (Combined View)'
     )
     
     context = {
         'files': files,
         'total_files': len(files),
         'current_file': virtual_file,
-        'content': final_content,
         'current_index': 'ALL',
         'progress_percentage': 100,
         'prev_file': None,
         'next_file': None,
-        'word_count': total_word_count,
-        'reading_time': total_reading_time,
         'view_mode': 'all'
     }
     
-    return render_template('index.html', **context)
+    if request.args.get('stream') == '0':
+        # 結合されたコンテンツ
+        final_content = '\n'.join(sections)
+        virtual_file.content = final_content
+        with timed_phase('render'):
+            html = render_template('index.html', content=final_content, **totals, **context)
+        return with_validators(html, etag, newest_mtime_ns)
+    
+    # 合計はセクションをすべて送った後にスクリプトで反映する
+    return with_validators(Response(stream_template('index.html', sections=sections, all_stats=totals,
+                                                    word_count=None, reading_time=None, **context)),
+                           etag, newest_mtime_ns)
 
 @app.route('/file/<path:file_path>')
 def view_file(file_path):
-    """特定のMarkdownファイルを表示"""
-    files = get_md_files_structure()
-    
-    # 現在のファイルを検索
-    current_file = None
-    current_index = None
+    """
+    特定のMarkdownファイルを表示
+    大きなファイルはoffset（バイト）の位置から一定の量ずつ表示し、続きへのリンクを付けます。
+    長いファイルは最初のセクションと見出しの一覧だけを返し、残りはスクロールに合わせて読み込みます。
+    """
+    # 現在のファイルの位置はカタログの索引から求める
+    with timed_phase('walk'):
+        files, position = catalog.locate(file_path)
+    if position is None:
+        abort(404)
     
-    for i, file_info in enumerate(files):
-        if file_info.path == file_path:
-            current_file = file_info
-            current_index = i + 1
-            break
+    current_file = files[position]
+    current_index = position + 1
     
-    if not current_file:
+    large = is_large_file(current_file)
+    offset = request.args.get('offset', 0, type=int)
+    if offset and not (large and 0 < offset < current_file.size_bytes):
         abort(404)
+    lazy = not offset and use_lazy_sections(current_file)
+    
+    # 変換前に条件付きリクエストを確認
+    with timed_phase('read'):
+        digest = current_file.digest
+    # ページにはサイドバーの一覧も含まれるため、更新時刻は一覧全体のものを使う
+    listing_digest, newest_mtime_ns = listing_validators(files)
+    etag = config_digest(PAGE_CONFIG_KEY, get_stylesheet().digest, listing_digest,
+                         digest, *([offset] if large else []), *(['lazy'] if lazy else []))
+    not_modified = conditional_response(etag, newest_mtime_ns)
+    if not_modified is not None:
+        return not_modified
     
     # 前後のファイルを取得
     prev_file = files[current_index - 2] if current_index > 1 else None
     next_file = files[current_index] if current_index < len(files) else None
     
-    # Markdownを処理
-    html_content = process_markdown(current_file.content)
+    # 見出しが1つだけのファイルは遅延させるセクションがない
+    outline = document_outline(current_file) if lazy else None
+    if outline is not None and len(outline.headings) < 2:
+        outline = None
     
-    # 統計情報を計算
-    word_count = count_words(current_file.content)
-    reading_time = calculate_reading_time(current_file.content)
+    if outline is not None:
+        # 最初のセクションと残りの見出しだけを変換する（統計情報は本文全体から求める）
+        html_content = lazy_sections_html(current_file, outline)
+        word_count = reading_time = None
+        if not large:
+            with timed_phase('stats'):
+                stats = cached_text_stats(digest) or get_text_stats(current_file.content, digest)
+            word_count, reading_time = stats.word_count, stats.reading_time
+    elif large:
+        # 表示する部分だけを読み込んで変換する（統計情報は表示しない）
+        try:
+            with timed_phase('read'):
+                chunk, next_offset = current_file.read_chunk(offset, LARGE_FILE_CHUNK_BYTES)
+        except ValueError:
+            abort(400)
+        warn_large_file(current_file, 'render')
+        html_content = process_markdown(chunk) + continuation_html(current_file, next_offset)
+        word_count = reading_time = None
+    else:
+        with timed_phase('read'):
+            content = current_file.content
+        
+        # Markdownを処理
+        html_content = process_markdown(content)
+        
+        # 統計情報を計算（同じ内容なら前回の結果を使う）
+        with timed_phase('stats'):
+            stats = get_text_stats(content, digest)
+        word_count, reading_time = stats.word_count, stats.reading_time
     
     # 進捗を計算
     progress_percentage = (current_index / len(files)) * 100 if files else 0
@@ -337,154 +792,409 @@ def view_file(file_path):
         'next_file': next_file,
         'word_count': word_count,
         'reading_time': reading_time,
-        'document_id': file_path
+        'document_id': file_path,
+        'lazy_sections': outline is not None
     }
     
-    return render_template('index.html', **context)
+    with timed_phase('render'):
+        html = render_template('index.html', **context)
+    return with_validators(html, etag, newest_mtime_ns)
+
+def locate_document(file_path):
+    """カタログからファイルを探す（見つからなければ404）"""
+    with timed_phase('walk'):
+        files, position = catalog.locate(file_path)
+    if position is None:
+        abort(404)
+    return files[position]
+
+@app.route('/api/file/<path:file_path>/outline')
+def api_file_outline(file_path):
+    """ドキュメントの見出しの索引（レベル・id・行番号・バイト位置）をJSONで返すAPI"""
+    file_info = locate_document(file_path)
+    with timed_phase('read'):
+        digest = file_info.digest
+    etag = config_digest(RENDER_CONFIG_KEY, digest, 'outline')
+    not_modified = conditional_response(etag, file_info.mtime_ns)
+    if not_modified is not None:
+        return not_modified
+
+    outline = document_outline(file_info)
+    return with_validators(jsonify({
+        'path': file_info.path,
+        'size_bytes': outline.size_bytes,
+        'headings': outline.to_list()
+    }), etag, file_info.mtime_ns)
+
+@app.route('/api/file/<path:file_path>/section/<slug>')
+def api_file_section(file_path, slug):
+    """
+    見出しslugのセクションだけを変換してJSONで返すAPI
+    nested=0を指定すると小見出しを含めず、次の見出しまでを返します。
+    """
+    file_info = locate_document(file_path)
+    nested = request.args.get('nested', 1, type=int) != 0
+    with timed_phase('read'):
+        digest = file_info.digest
+    etag = config_digest(RENDER_CONFIG_KEY, digest, 'section', slug, nested)
+    not_modified = conditional_response(etag, file_info.mtime_ns)
+    if not_modified is not None:
+        return not_modified
+
+    outline = document_outline(file_info)
+    heading = outline.find(slug)
+    if heading is None:
+        abort(404)
+
+    end = heading.section_end if nested else heading.end
+    html_content = render_section(file_info, outline, heading.line, heading.start, end)
+    return with_validators(jsonify(dict(heading.to_dict(), path=file_info.path, nested=nested, html=html_content)),
+                           etag, file_info.mtime_ns)
+
+# ファイル一覧APIの項目（fieldsを指定しない場合はFILE_FIELDSを返す）
+FILE_FIELDS = ('index', 'modified', 'name', 'path', 'size', 'url')
+FILE_OPTIONAL_FIELDS = ('mtime_ns', 'size_bytes')
+
+# エントリごとのJSON断片（ファイル一覧ごとに、出力する項目の組ごとに保持する）
+_file_fragments = (None, {})
+_file_fragments_lock = threading.Lock()
+
+def file_field(file_info, index, field):
+    """ファイル一覧APIの項目の値"""
+    if field == 'index':
+        return index
+    if field == 'url':
+        return url_for('view_file', file_path=file_info.path)
+    return getattr(file_info, field)
+
+def file_fragments(files, fields):
+    """
+    各エントリをJSONにした断片のリストを返します。
+    同じファイル一覧と項目の組に対しては、url_forやJSONへの変換を繰り返しません。
+    """
+    global _file_fragments
+    key = (request.script_root, fields)
+    with _file_fragments_lock:
+        cached_files, fragments_by_key = _file_fragments
+        if cached_files is not files:
+            fragments_by_key = {}
+            _file_fragments = (files, fragments_by_key)
+        fragments = fragments_by_key.get(key)
+    if fragments is not None:
+        return fragments
+    
+    fragments = [
+        app.json.dumps({field: file_field(file_info, i, field) for field in fields}, separators=(',', ':'))
+        for i, file_info in enumerate(files, 1)
+    ]
+    with _file_fragments_lock:
+        fragments_by_key[key] = fragments
+    return fragments
 
 @app.route('/api/files')
 def api_files():
-    """ファイル一覧をJSONで返すAPI"""
+    """
+    ファイル一覧をJSONで返すAPI
+    offset/limitでページングし、fieldsで返す項目を選べます（例: fields=path,name）。
+    since（mtime_ns）を指定すると、それより後に更新されたファイルだけを返します。
+    """
     files = get_md_files_structure()
     
-    files_data = []
-    for i, file_info in enumerate(files):
-        files_data.append({
-            'path': file_info.path,
-            'name': file_info.name,
-            'index': i + 1,
-            'size': file_info.size,
-            'modified': file_info.modified,
-            'url': url_for('view_file', file_path=file_info.path)
+    fields = FILE_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(sorted(set(field.strip() for field in request.args['fields'].split(','))))
+        unknown = [field for field in fields if field not in FILE_FIELDS + FILE_OPTIONAL_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    
+    paged = 'offset' in request.args or 'limit' in request.args
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = request.args.get('limit', None, type=int)
+    if limit is not None:
+        limit = max(limit, 1)
+    since = request.args.get('since', None, type=int)
+    
+    listing_digest, newest_mtime_ns = listing_validators(files)
+    etag = config_digest(listing_digest, fields, offset, limit, since)
+    not_modified = conditional_response(etag, newest_mtime_ns)
+    if not_modified is not None:
+        return not_modified
+    
+    with timed_phase('render'):
+        fragments = file_fragments(files, fields)
+    if since is not None:
+        fragments = [fragment for file_info, fragment in zip(files, fragments) if file_info.mtime_ns > since]
+    end = len(fragments) if limit is None else offset + limit
+    
+    extra = {'total': len(files)}
+    if paged:
+        extra.update({
+            'offset': offset,
+            'limit': limit,
+            'next_offset': end if end < len(fragments) else None
         })
     
-    return jsonify({
-        'files': files_data,
-        'total': len(files)
-    })
+    dumps = app.json.dumps
+    body = ''.join([
+        '{"files":[', ','.join(fragments[offset:end]), '],',
+        ','.join(dumps(key) + ':' + dumps(value) for key, value in sorted(extra.items())),
+        '}\n'
+    ])
+    return with_validators(Response(body, mimetype='application/json'), etag, newest_mtime_ns)
+
+def make_search_result(query, match_type, file_info, line_num, line):
+    """検索ヒットをAPIの結果形式に変換"""
+    if match_type == 'filename':
+        # ファイル名での検索
+        return {
+            'type': 'filename',
+            'file_path': file_info.path,
+            'file_name': file_info.name,
+            'match': file_info.name,
+            'url': url_for('view_file', file_path=file_info.path)
+        }
+    
+    # コンテキストを抽出
+    start_pos = max(0, line.lower().find(query.lower()) - 50)
+    end_pos = min(len(line), start_pos + 100)
+    context = line[start_pos:end_pos]
+    
+    if start_pos > 0:
+        context = '...' + context
+    if end_pos < len(line):
+        context = context + '...'
+    
+    return {
+        'type': 'content',
+        'file_path': file_info.path,
+        'file_name': file_info.name,
+        'line_number': line_num,
+        'match': context,
+        'url': url_for('view_file', file_path=file_info.path) + f'#line-{line_num}'
+    }
 
 @app.route('/api/search')
 def api_search():
-    """検索API"""
+    """
+    検索API
+    limit/offsetでページングし、format=ndjsonの場合は見つかった順に1行ずつ返します。
+    必要な件数が揃った時点で検索を打ち切ります。
+    """
     query = request.args.get('q', '').strip()
     if not query:
         return jsonify({'results': []})
     
+    limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
     files = get_md_files_structure()
-    results = []
     
-    for file_info in files:
-        # ファイル名での検索
-        if query.lower() in file_info.name.lower():
-            results.append({
-                'type': 'filename',
-                'file_path': file_info.path,
-                'file_name': file_info.name,
-                'match': file_info.name,
-                'url': url_for('view_file', file_path=file_info.path)
-            })
+    # 検索結果はファイル一覧（更新時刻とサイズ）と検索条件で決まる
+    listing_digest, newest_mtime_ns = listing_validators(files)
+    etag = config_digest(listing_digest, query, limit, offset, request.args.get('format'))
+    not_modified = conditional_response(etag, newest_mtime_ns)
+    if not_modified is not None:
+        return not_modified
+    
+    with timed_phase('index'):
+        search_index.sync(files, catalog.version)
+    
+    # 次のページの有無を判定するため1件多く取り出す
+    hits = itertools.islice(search_index.search(query, files), offset, offset + limit + 1)
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for count, hit in enumerate(hits):
+                if count == limit:
+                    yield app.json.dumps({'done': True, 'next_offset': offset + limit}) + '\n'
+                    return
+                yield app.json.dumps(make_search_result(query, *hit)) + '\n'
+            yield app.json.dumps({'done': True, 'next_offset': None}) + '\n'
         
-        # コンテンツでの検索
-        lines = file_info.content.split('\n')
-        for line_num, line in enumerate(lines, 1):
-            if query.lower() in line.lower():
-                # コンテキストを抽出
-                start_pos = max(0, line.lower().find(query.lower()) - 50)
-                end_pos = min(len(line), start_pos + 100)
-                context = line[start_pos:end_pos]
-                
-                if start_pos > 0:
-                    context = '...' + context
-                if end_pos < len(line):
-                    context = context + '...'
-                
-                results.append({
-                    'type': 'content',
-                    'file_path': file_info.path,
-                    'file_name': file_info.name,
-                    'line_number': line_num,
-                    'match': context,
-                    'url': url_for('view_file', file_path=file_info.path) + f'#line-{line_num}'
-                })
+        return with_validators(Response(stream_with_context(generate()), mimetype='application/x-ndjson'),
+                               etag, newest_mtime_ns)
+    
+    with timed_phase('search'):
+        results = [make_search_result(query, *hit) for hit in hits]
     
-    return jsonify({'results': results[:20]})  # 最大20件まで
+    return with_validators(jsonify({
+        'results': results[:limit],
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if len(results) > limit else None
+    }), etag, newest_mtime_ns)
 
-@app.errorhandler(404)
-def not_found_error(error):
-    """404エラーハンドラ"""
-    files = get_md_files_structure()
+@app.route('/api/stats')
+def api_stats():
+    """キャッシュ等の利用状況をJSONで返すAPI"""
+    return jsonify({
+        'catalog': catalog.stats(),
+        'catalog_snapshot': catalog_store.stats() if catalog_store is not None else None,
+        'render_cache': render_cache.stats(),
+        'converter_pool': converter_pool.stats(),
+        'search_index': search_index.stats(),
+        'stylesheet': stylesheet_compiler.stats(),
+        'error_pages': dict(error_page_stats),
+        'large_files': large_file_stats(),
+        'watcher': docs_watcher.stats()
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    ルート・段階ごとの所要時間のヒストグラムと、キャッシュやカタログの状態を
+    Prometheusのテキスト形式で返す（METRICS_ENABLEDがFalseの場合は404）
+    """
+    if not METRICS_ENABLED:
+        abort(404)
     
-    context = {
-        'files': files,
-        'total_files': len(files),
-        'current_file': None,
-        'content': '<h1>Page Not Found</h1><p>The requested file could not be found.</p>',
-        'current_index': None,
-        'progress_percentage': 0,
-        'prev_file': None,
-        'next_file': None,
-        'word_count': None,
-        'reading_time': None
+    catalog_stats = catalog.stats()
+    render_stats = render_cache.stats()
+    caches = {
+        'catalog': (catalog_stats['hits'], catalog_stats['misses']),
+        'render': (render_stats['hits'] + render_stats['disk_hits'], render_stats['misses'])
+    }
+    counters = [
+        ('cache_hits_total', 'Cache hits', [((('cache', name),), hits) for name, (hits, _) in caches.items()]),
+        ('cache_misses_total', 'Cache misses',
+         [((('cache', name),), misses) for name, (_, misses) in caches.items()]),
+        ('files_read_total', 'Document files read from disk', [((), read_stats['files'])]),
+        ('bytes_read_total', 'Bytes of document content read from disk', [((), read_stats['bytes'])]),
+        ('catalog_rebuilds_total', 'Catalog directory scans', [((), catalog_stats['rebuilds'])])
+    ]
+    gauges = [
+        ('cache_hit_ratio', 'Cache hit ratio since startup',
+         [((('cache', name),), hits / (hits + misses) if hits + misses else 0.0)
+          for name, (hits, misses) in caches.items()]),
+        ('catalog_files', 'Documents in the catalog', [((), catalog_stats['files'])]),
+        ('catalog_last_build_seconds', 'Duration of the last catalog scan',
+         [((), catalog_stats['last_build_ms'] / 1000)]),
+        ('catalog_scan_files_per_second', 'Throughput of the last catalog scan',
+         [((), catalog_stats['last_build_files_per_second'])]),
+        ('render_cache_entries', 'Entries in the render cache', [((), render_stats['entries'])]),
+        ('render_cache_bytes', 'Bytes held by the render cache', [((), render_stats['bytes'])]),
+        ('search_index_documents', 'Documents in the search index', [((), search_index.stats()['documents'])])
+    ]
+    return Response(metrics.render(gauges, counters), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def large_file_stats():
+    """大きなファイルの扱いに関する設定と警告"""
+    with _large_file_lock:
+        warnings = list(large_file_warnings.values())
+    return {
+        'threshold_bytes': LARGE_FILE_THRESHOLD,
+        'chunk_bytes': LARGE_FILE_CHUNK_BYTES,
+        'index_max_bytes': SEARCH_INDEX_MAX_BYTES,
+        'warnings': warnings
     }
+
+# サイドバーなしの最小限のエラーページ（テンプレートもカタログも使わない）
+MINIMAL_ERROR_PAGE = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Markdown Reader</title>
+</head>
+<body>
+    {content}
+    <p><a href="{home}">Back to Markdown Reader</a></p>
+</body>
+</html>
+"""
+
+# エラーページの描画状況
+error_page_stats = {'rendered': 0, 'fallbacks': 0, 'slow': 0}
+_error_page_lock = threading.Lock()
+_error_pages_degraded_until = 0.0
+
+def render_error_page(content, status):
+    """
+    エラーページを返します。
+    カタログの再検証や再構築は行わず、構築済みのファイル一覧があればそれを使います。
+    一覧がない場合や、描画が時間の目安を超えた後しばらくの間は、
+    最小限のページを返します（その回数はfallbacksに記録されます）。
+    """
+    global _error_pages_degraded_until
+    files = catalog.snapshot()
+    
+    if files is not None and time.monotonic() >= _error_pages_degraded_until:
+        context = {
+            'files': files,
+            'total_files': len(files),
+            'current_file': None,
+            'content': content,
+            'current_index': None,
+            'progress_percentage': 0,
+            'prev_file': None,
+            'next_file': None,
+            'word_count': None,
+            'reading_time': None
+        }
+        
+        started = time.perf_counter()
+        try:
+            with timed_phase('render'):
+                html = render_template('index.html', **context)
+        except Exception as e:
+            print(f"Warning: Could not render error page: {e}")
+        else:
+            with _error_page_lock:
+                error_page_stats['rendered'] += 1
+                if time.perf_counter() - started > ERROR_PAGE_TIME_BUDGET:
+                    # 以降しばらくは最小限のページで応答する
+                    error_page_stats['slow'] += 1
+                    _error_pages_degraded_until = time.monotonic() + ERROR_PAGE_DEGRADED_SECONDS
+            return html, status
     
-    return render_template('index.html', **context), 404
+    with _error_page_lock:
+        error_page_stats['fallbacks'] += 1
+    return MINIMAL_ERROR_PAGE.format(content=content, home=escape(request.script_root + '/')), status
+
+@app.errorhandler(404)
+def not_found_error(error):
+    """404エラーハンドラ"""
+    return render_error_page('<h1>Page Not Found</h1><p>The requested file could not be found.</p>', 404)
 
 @app.errorhandler(500)
 def internal_error(error):
     """500エラーハンドラ"""
-    files = get_md_files_structure()
-    
-    context = {
-        'files': files,
-        'total_files': len(files),
-        'current_file': None,
-        'content': '<h1>Internal Server Error</h1><p>An error occurred while processing your request.</p>',
-        'current_index': None,
-        'progress_percentage': 0,
-        'prev_file': None,
-        'next_file': None,
-        'word_count': None,
-        'reading_time': None
-    }
-    
-    return render_template('index.html', **context), 500
+    return render_error_page(
+        '<h1>Internal Server Error</h1><p>An error occurred while processing your request.</p>', 500
+    )
 
 # SCSS compilation route for development
 @app.route('/static/css/main.css')
 def compile_scss():
-    """SCSS to CSS compilation endpoint for development"""
-    try:
-        import sass
-        
-        # Compile SCSS to CSS
-        css_content = sass.compile(
-            filename=os.path.join(app.static_folder, 'scss', 'main.scss'),
-            output_style='expanded',
-            include_paths=[os.path.join(app.static_folder, 'scss')]
-        )
-        
-        from flask import Response
-        return Response(css_content, mimetype='text/css')
-        
-    except ImportError:
-        # Fallback: serve a basic CSS file if sass is not installed
-        basic_css = """
-        /* Basic fallback styles */
-        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; }
-        .app-container { display: flex; min-height: 100vh; }
-        .sidebar { width: 300px; background: #f8f9fa; padding: 1rem; }
-        .main-content { flex: 1; padding: 1rem; }
-        .markdown-content { max-width: 800px; margin: 0 auto; }
-        """
-        from flask import Response
-        return Response(basic_css, mimetype='text/css')
-    except Exception as e:
-        # Error handling
-        error_css = f"/* SCSS compilation error: {str(e)} */"
-        from flask import Response
-        return Response(error_css, mimetype='text/css')
+    """コンパイル済みのCSSを返す（URLが固定のため毎回再検証させる）"""
+    stylesheet = get_stylesheet()
+    not_modified = conditional_response(stylesheet.digest, stylesheet.mtime_ns)
+    if not_modified is not None:
+        return not_modified
+    return with_validators(Response(stylesheet.css, mimetype='text/css'), stylesheet.digest, stylesheet.mtime_ns)
+
+@app.route('/static/css/main.<digest>.css')
+def hashed_stylesheet(digest):
+    """内容のハッシュ付きのURLでCSSを返す（内容が変わればURLも変わるため長期間キャッシュさせる）"""
+    stylesheet = get_stylesheet()
+    if digest != stylesheet.digest:
+        return redirect(url_for('hashed_stylesheet', digest=stylesheet.digest))
+    
+    response = with_validators(Response(stylesheet.css, mimetype='text/css'), stylesheet.digest, stylesheet.mtime_ns)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = STYLESHEET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
 if __name__ == '__main__':
+    import sys
+    
+    # python app.py build --out dist/ で静的サイトとして書き出す
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        import build
+        sys.exit(build.main(sys.modules[__name__], sys.argv[2:]))
+    
     # 開発用の設定
     app.run(
         debug=True,
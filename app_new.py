@@ -8,6 +8,7 @@ from flask import Flask, render_template, abort, jsonify, request, url_for
 import markdown
 from markdown.extensions.toc import TocExtension
 from markdown.extensions import codehilite, fenced_code, tables
+from converter_pool import ConverterPool
 
 # Flaskアプリケーションを作成します
 app = Flask(__name__)
@@ -144,8 +145,8 @@ def count_words(content):
     # CJK文字は1文字を1語として計算
     return cjk_chars + latin_words
 
-def process_markdown(content):
-    """Markdownコンテンツを処理してHTMLに変換"""
+def create_markdown_converter():
+    """拡張機能を登録済みのMarkdownコンバーターを作成"""
     # Markdown拡張機能を設定
     extensions = [
         'markdown.extensions.tables',
@@ -171,12 +172,18 @@ def process_markdown(content):
         }
     }
     
-    md = markdown.Markdown(
+    return markdown.Markdown(
         extensions=extensions,
         extension_configs=extension_configs
     )
-    
-    html_content = md.convert(content)
+
+# 構築済みコンバーターのプール（リクエストごとに貸し出す）
+converter_pool = ConverterPool(create_markdown_converter)
+
+def process_markdown(content):
+    """Markdownコンテンツを処理してHTMLに変換"""
+    with converter_pool.converter() as md:
+        html_content = md.convert(content)
     return html_content
 
 @app.route('/')
@@ -0,0 +1,5 @@
+# benchmarks - 性能計測用のスクリプトとベンチマークスイート
+# ========================================================
+#
+# python -m benchmarks.suite でルートと主要な関数をまとめて計測します。
+# bench_*.py は個別の変更の前後を比較するためのスクリプトです。
@@ -0,0 +1,113 @@
+# bench_api_files.py - /api/files のRSSとレイテンシを計測するベンチマーク
+# =====================================================================
+#
+# 使い方:
+#   python benchmarks/bench_api_files.py --files 50000
+#   python benchmarks/bench_api_files.py --files 50000 --repo /path/to/old/checkout
+#
+# --repo に別のチェックアウトを指定すると、そのapp.pyで同じ計測を行います
+# （変更前後の比較用）。計測はクリーンなサブプロセスで実行します。
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARAGRAPHS = [
+    'Markdown Reader はドキュメントを読みやすく表示するためのビューアーです。',
+    'The quick brown fox jumps over the lazy dog while reading documentation.',
+    '検索機能とキーボードショートカットで効率的にナビゲーションできます。',
+    'Each section can contain tables, code blocks and footnotes.',
+]
+
+def generate_corpus(root, file_count, body_bytes, seed=0):
+    """番号付き接頭辞のMarkdownファイルを持つ合成ツリーを生成"""
+    rng = random.Random(seed)
+    docs = os.path.join(root, 'docs')
+    per_dir = 500
+    for i in range(file_count):
+        folder = os.path.join(docs, f'{i // per_dir + 1}_section')
+        if i % per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        lines = [f'# Document {i + 1}', '']
+        size = 0
+        while size < body_bytes:
+            line = rng.choice(PARAGRAPHS)
+            lines.append(line)
+            size += len(line.encode('utf-8')) + 1
+        with open(os.path.join(folder, f'{i % per_dir + 1}_doc.md'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+def measure(repo, corpus, requests):
+    """サブプロセス内で呼ばれる計測本体"""
+    import resource
+    import time
+
+    os.chdir(corpus)
+    sys.path.insert(0, repo)
+
+    # 起動時にカタログを構築する場合もあるため、importから最初の応答までを計測
+    started = time.perf_counter()
+    import app as app_module
+    client = app_module.app.test_client()
+    response = client.get('/api/files')
+    cold = time.perf_counter() - started
+    assert response.status_code == 200
+
+    warm = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get('/api/files')
+        warm.append(time.perf_counter() - started)
+    warm.sort()
+
+    with open('/proc/self/statm') as f:
+        rss_pages = int(f.read().split()[1])
+
+    return {
+        'files': response.get_json()['total'],
+        'cold_ms': round(cold * 1000, 1),
+        'warm_median_ms': round(warm[len(warm) // 2] * 1000, 1) if warm else None,
+        'rss_mb': round(rss_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/files のRSSとレイテンシを計測')
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--body-bytes', type=int, default=4096)
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--repo', default=REPO_DIR, help='計測対象のチェックアウト')
+    parser.add_argument('--corpus', help='既存の合成ツリーを再利用する')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repo, args.corpus, args.requests)))
+        return
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix='md-bench-')
+    try:
+        if not args.corpus:
+            generate_corpus(corpus, args.files, args.body_bytes)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure',
+             '--repo', os.path.abspath(args.repo), '--corpus', corpus,
+             '--requests', str(args.requests)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['repo'] = os.path.abspath(args.repo)
+        print(json.dumps(result, indent=2))
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
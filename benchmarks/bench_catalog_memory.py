@@ -0,0 +1,76 @@
+# bench_catalog_memory.py - カタログの1エントリあたりのメモリ使用量
+# =================================================================
+#
+# 使い方:
+#   python benchmarks/bench_catalog_memory.py --files 100000
+#   python benchmarks/bench_catalog_memory.py --corpus /path/to/tree --repo /path/to/old/checkout
+#
+# scan_md_filesで構築したFileInfoのリストと、変更検知用のシグネチャが
+# 保持するメモリをtracemallocで計測し、1エントリあたりのバイト数を表示します。
+# サイドバーの表示と同じくsize/modifiedの文字列も一度ずつ参照します。
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description='カタログのメモリ使用量の計測')
+    parser.add_argument('--files', type=int, default=100000, help='生成するファイル数')
+    parser.add_argument('--corpus', help='既存のドキュメントツリー（指定時は生成しない）')
+    parser.add_argument('--repo', default=REPO_DIR, help='計測するチェックアウト')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from bench_api_files import generate_corpus
+
+    corpus = args.corpus
+    tmp_dir = None
+    if corpus is None:
+        tmp_dir = corpus = tempfile.mkdtemp(prefix='md-corpus-')
+        generate_corpus(corpus, args.files, body_bytes=64)
+
+    try:
+        sys.path.insert(0, os.path.abspath(args.repo))
+        from catalog import scan_md_files
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        files, signature = scan_md_files(corpus)
+        gc.collect()
+        after_scan = tracemalloc.get_traced_memory()[0]
+        peak = tracemalloc.get_traced_memory()[1]
+
+        # テンプレートと同じく表示用の文字列を参照する
+        for file_info in files:
+            file_info.size, file_info.modified
+        gc.collect()
+        after_access = tracemalloc.get_traced_memory()[0]
+
+        del signature
+        gc.collect()
+        files_only = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        count = len(files)
+        print(json.dumps({
+            'repo': os.path.abspath(args.repo),
+            'entries': count,
+            'bytes_per_entry_files': round((files_only - before) / count, 1),
+            'bytes_per_entry_with_signature': round((after_scan - before) / count, 1),
+            'bytes_per_entry_after_display': round((after_access - before) / count, 1),
+            'scan_peak_mb': round((peak - before) / 1024 / 1024, 1)
+        }, indent=2))
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
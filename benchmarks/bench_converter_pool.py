@@ -0,0 +1,107 @@
+# bench_converter_pool.py - Markdown変換レイテンシのマイクロベンチマーク
+# ======================================================================
+#
+# 使い方:
+#   python benchmarks/bench_converter_pool.py
+#   python benchmarks/bench_converter_pool.py --threads 1 8 32 --iterations 200
+#
+# リクエストごとにmarkdown.Markdownを構築する方式と、ConverterPoolから
+# 借り出す方式で、同時スレッド数ごとの1変換あたりのレイテンシを比較します。
+# 変換済みHTMLキャッシュは経由しません。
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_markdown_converter
+from converter_pool import ConverterPool
+
+SAMPLE_DOCUMENT = '''# サンプルドキュメント
+
+Markdown Reader はドキュメントを読みやすく表示します。The quick brown fox jumps over the lazy dog.
+
+## コード
+
+```python
+def fibonacci(n):
+    """フィボナッチ数を返す"""
+    if n < 2:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+```
+
+| 列A | 列B |
+|-----|-----|
+| 1   | 2   |
+
+用語
+:   定義リストの説明[^1]
+
+[^1]: 脚注の本文
+'''
+
+def convert_fresh(content):
+    return create_markdown_converter().convert(content)
+
+def make_pooled():
+    pool = ConverterPool(create_markdown_converter, max_idle=64)
+
+    def convert_pooled(content):
+        with pool.converter() as md:
+            return md.convert(content)
+    return convert_pooled
+
+def run(convert, threads, iterations, content):
+    """指定スレッド数で変換し、1変換あたりのレイテンシを集計"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        local = []
+        barrier.wait()
+        for _ in range(iterations):
+            started = time.perf_counter()
+            convert(content)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'threads': threads,
+        'conversions': len(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        'throughput_per_s': round(len(latencies) / elapsed, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdown変換レイテンシの比較')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=100, help='スレッドあたりの変換回数')
+    args = parser.parse_args()
+
+    results = []
+    for threads in args.threads:
+        for mode, convert in (('fresh', convert_fresh), ('pool', make_pooled())):
+            result = run(convert, threads, args.iterations, SAMPLE_DOCUMENT)
+            result['mode'] = mode
+            results.append(result)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# bench_scan.py - カタログ構築時のディレクトリ探索のスループット
+# ===============================================================
+#
+# 使い方:
+#   python benchmarks/bench_scan.py --files 50000
+#   python benchmarks/bench_scan.py --corpus /mnt/nfs/docs --workers 1 4 8 16
+#
+# scan_md_filesをスレッド数ごとに実行し、所要時間と1秒あたりのファイル数を表示します。
+# ローカルディスクではスレッドを増やしても速くならないことが多く、効果があるのは
+# NFSなど1回のstatやscandirに往復の待ち時間がかかるファイルシステムです。
+# --digests を指定すると、read_digestsによる本文の並行読み込みも計測します。
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+from catalog import read_digests, scan_md_files
+
+def measure(func, repeat):
+    """最小の所要時間（秒）と結果を返す"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description='ディレクトリ探索のスループットの計測')
+    parser.add_argument('--files', type=int, default=20000, help='生成するファイル数')
+    parser.add_argument('--corpus', help='既存のドキュメントツリー（指定時は生成しない）')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--digests', action='store_true', help='本文のダイジェストの計算も計測する')
+    args = parser.parse_args()
+
+    corpus = args.corpus
+    tmp_dir = None
+    if corpus is None:
+        tmp_dir = corpus = tempfile.mkdtemp(prefix='md-corpus-')
+        generate_corpus(corpus, CorpusSpec(files=args.files, depth=3, median_bytes=512))
+
+    try:
+        results = []
+        for workers in args.workers:
+            (files, _), seconds = measure(lambda: scan_md_files(corpus, workers), args.repeat)
+            result = {
+                'workers': workers,
+                'files': len(files),
+                'scan_ms': round(seconds * 1000, 1),
+                'files_per_second': round(len(files) / seconds) if seconds else None
+            }
+            if args.digests:
+                # ダイジェストは計算済みの値を保持するため、毎回探索し直したリストで計測する
+                _, seconds = measure(lambda: read_digests(scan_md_files(corpus)[0], workers), args.repeat)
+                result['scan_and_digest_ms'] = round(seconds * 1000, 1)
+            results.append(result)
+        print(json.dumps(results, indent=2))
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# bench_text_stats.py - 単語数・読書時間の計算のベンチマーク
+# ===========================================================
+#
+# 使い方:
+#   python benchmarks/bench_text_stats.py
+#   python benchmarks/bench_text_stats.py --sizes 100000 1000000 5000000 --repeat 5
+#
+# 日本語と英語が混在する大きなドキュメントを生成し、count_wordsと
+# calculate_reading_timeがそれぞれ2回ずつre.findallを行っていた従来の方式と、
+# 1回の走査で数えるanalyze_text、およびキャッシュ済みのget_text_statsを比較します。
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_cache import content_digest
+from text_stats import (CJK_RANGES, READING_SPEED_CJK, READING_SPEED_LATIN, analyze_text,
+                        get_text_stats)
+
+PARAGRAPHS = [
+    'Markdown Reader はドキュメントを読みやすく表示します。日本語と English が混在した文章を想定しています。\n\n',
+    'The quick brown fox jumps over the lazy dog while the parser walks through every paragraph.\n\n',
+    '## 見出し Section heading\n\n',
+    '```python\ndef count_words(content):\n    return len(content.split())  # コメント\n```\n\n',
+    '- 箇条書きの項目 with some inline `code` and a [link](https://example.com)\n',
+    '| 列A | Column B |\n|-----|----------|\n| 値 | value |\n\n'
+]
+
+def generate_document(size, seed=0):
+    """指定した文字数程度の日英混在ドキュメントを生成"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        paragraph = rng.choice(PARAGRAPHS)
+        parts.append(paragraph)
+        length += len(paragraph)
+    return ''.join(parts)
+
+def legacy_stats(content):
+    """従来の実装（count_words + calculate_reading_time で計4回の走査）"""
+    cjk_chars = len(re.findall(f'[{CJK_RANGES}]', content))
+    latin_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
+    word_count = cjk_chars + latin_words
+
+    cjk_chars = len(re.findall(f'[{CJK_RANGES}]', content))
+    latin_words = len(re.findall(r'\b[a-zA-Z]+\b', content))
+    reading_time = max(1, round(cjk_chars / READING_SPEED_CJK + latin_words / READING_SPEED_LATIN))
+    return word_count, reading_time
+
+def single_pass_stats(content):
+    stats = analyze_text(content)
+    return stats.word_count, stats.reading_time
+
+def cached_stats(content, digest):
+    stats = get_text_stats(content, digest)
+    return stats.word_count, stats.reading_time
+
+def measure(func, args, repeat):
+    """最小の所要時間（ミリ秒）を返す"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, round(best * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description='テキスト統計の計算方式の比較')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000],
+                        help='ドキュメントの文字数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        content = generate_document(size)
+        digest = content_digest(content)
+        legacy, legacy_ms = measure(legacy_stats, (content,), args.repeat)
+        single, single_ms = measure(single_pass_stats, (content,), args.repeat)
+        # 1回目でキャッシュされるため、2回目以降の時間を計測する
+        cached_stats(content, digest)
+        cached, cached_ms = measure(cached_stats, (content, digest), args.repeat)
+        assert legacy == single == cached
+        results.append({
+            'chars': len(content),
+            'word_count': single[0],
+            'legacy_ms': legacy_ms,
+            'single_pass_ms': single_ms,
+            'cached_ms': cached_ms,
+            'speedup': round(legacy_ms / single_ms, 2) if single_ms else None
+        })
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
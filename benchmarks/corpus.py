@@ -0,0 +1,159 @@
+# corpus.py - ベンチマーク用の合成ドキュメントツリー
+# ==================================================
+#
+# 使い方:
+#   python -m benchmarks.corpus --out /tmp/md-corpus --files 2000 --depth 3 --jp-ratio 0.5
+#
+# 同じ設定とシードからは常に同じツリーを生成します。ファイルは <out>/docs 以下に作成され、
+# アプリはその親ディレクトリ（<out>）をカレントディレクトリとして起動します。
+
+import argparse
+import json
+import math
+import os
+import random
+
+PARAGRAPHS_JA = [
+    'Markdown Reader はドキュメントを読みやすく表示するためのビューアーです。',
+    '検索機能とキーボードショートカットで効率的にナビゲーションできます。',
+    'サイドバーには番号順に並べたファイルの一覧が表示されます。',
+    '大きなドキュメントでも目次から任意の見出しに移動できます。',
+]
+
+PARAGRAPHS_EN = [
+    'The quick brown fox jumps over the lazy dog while reading documentation.',
+    'Each section can contain tables, code blocks, footnotes and nested lists.',
+    'Readers move between documents with the previous and next links.',
+    'Search results are ranked by how often the query terms appear.',
+]
+
+CODE_BLOCKS = [
+    '```python\ndef fibonacci(n):\n    """フィボナッチ数を返す"""\n    if n < 2:\n        return n\n'
+    '    return fibonacci(n - 1) + fibonacci(n - 2)\n```',
+    '```javascript\nconst items = document.querySelectorAll(\'.sidebar-nav-item\');\n'
+    'items.forEach(item => item.classList.remove(\'active\'));\n```',
+    '```bash\npython -m venv .venv\nsource .venv/bin/activate\npip install -r requirements.txt\n```',
+]
+
+TABLE = '| 列A | Column B |\n|-----|----------|\n| 値 | value |\n| 1 | 2 |'
+
+class CorpusSpec:
+    """生成するツリーの設定"""
+    def __init__(self, files=1000, depth=2, fanout=4, unprefixed_ratio=0.05, jp_ratio=0.5,
+                 code_density=0.15, median_bytes=4096, size_sigma=1.0, max_bytes=512 * 1024, seed=0):
+        self.files = files
+        # ディレクトリの階層の深さと、各ディレクトリのサブディレクトリ数
+        self.depth = depth
+        self.fanout = fanout
+        # 番号付き接頭辞のないファイル（カタログの対象外）の割合
+        self.unprefixed_ratio = unprefixed_ratio
+        # 日本語の段落の割合
+        self.jp_ratio = jp_ratio
+        # ブロックがコードブロックになる確率
+        self.code_density = code_density
+        # ファイルサイズは中央値median_bytes、ばらつきsize_sigmaの対数正規分布（max_bytesで打ち切り）
+        self.median_bytes = median_bytes
+        self.size_sigma = size_sigma
+        self.max_bytes = max_bytes
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+def directories(spec):
+    """番号付きのディレクトリの一覧（ドキュメントディレクトリからの相対パス、ルートは''）"""
+    result = ['']
+    level = ['']
+    for _ in range(spec.depth):
+        level = [os.path.join(parent, f'{i}_section') for parent in level for i in range(1, spec.fanout + 1)]
+        result.extend(level)
+    return result
+
+def generate_document(rng, spec, title, size):
+    """見出し・段落・コードブロック・表を含む、おおよそsizeバイトのドキュメントを生成"""
+    blocks = [f'# {title}']
+    length = len(blocks[0].encode('utf-8'))
+    section = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.08:
+            section += 1
+            block = f'## セクション {section} Section {section}'
+        elif roll < 0.08 + spec.code_density:
+            block = rng.choice(CODE_BLOCKS)
+        elif roll < 0.12 + spec.code_density:
+            block = TABLE
+        else:
+            pool = PARAGRAPHS_JA if rng.random() < spec.jp_ratio else PARAGRAPHS_EN
+            block = ' '.join(rng.choice(pool) for _ in range(rng.randint(1, 4)))
+        blocks.append(block)
+        length += len(block.encode('utf-8')) + 2
+    return '\n\n'.join(blocks) + '\n'
+
+def generate_corpus(root, spec):
+    """
+    root/docs 以下にツリーを生成し、カタログの対象となるファイルの相対パスを返します
+    （rootからの相対パスで、生成順）。
+    """
+    rng = random.Random(spec.seed)
+    docs = os.path.join(root, 'docs')
+    folders = directories(spec)
+    counters = {}
+    paths = []
+    for i in range(spec.files):
+        folder = rng.choice(folders)
+        number = counters[folder] = counters.get(folder, 0) + 1
+        prefixed = rng.random() >= spec.unprefixed_ratio
+        filename = f'{number}_doc_{i + 1}.md' if prefixed else f'notes_{i + 1}.md'
+        size = min(int(spec.median_bytes * math.exp(rng.gauss(0, spec.size_sigma))), spec.max_bytes)
+
+        directory = os.path.join(docs, folder)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            f.write(generate_document(rng, spec, f'Document {i + 1} ドキュメント', size))
+        if prefixed:
+            paths.append(os.path.join('docs', folder, filename))
+    return paths
+
+def add_arguments(parser):
+    """CorpusSpecの設定をコマンドライン引数に追加"""
+    defaults = CorpusSpec()
+    parser.add_argument('--files', type=int, default=defaults.files, help='生成するファイル数')
+    parser.add_argument('--depth', type=int, default=defaults.depth, help='ディレクトリの階層の深さ')
+    parser.add_argument('--fanout', type=int, default=defaults.fanout, help='各ディレクトリのサブディレクトリ数')
+    parser.add_argument('--unprefixed-ratio', type=float, default=defaults.unprefixed_ratio,
+                        help='番号付き接頭辞のないファイルの割合')
+    parser.add_argument('--jp-ratio', type=float, default=defaults.jp_ratio, help='日本語の段落の割合')
+    parser.add_argument('--code-density', type=float, default=defaults.code_density,
+                        help='ブロックがコードブロックになる確率')
+    parser.add_argument('--median-bytes', type=int, default=defaults.median_bytes, help='ファイルサイズの中央値')
+    parser.add_argument('--size-sigma', type=float, default=defaults.size_sigma, help='ファイルサイズのばらつき')
+    parser.add_argument('--max-bytes', type=int, default=defaults.max_bytes, help='ファイルサイズの上限')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+
+def spec_from_args(args):
+    return CorpusSpec(
+        files=args.files,
+        depth=args.depth,
+        fanout=args.fanout,
+        unprefixed_ratio=args.unprefixed_ratio,
+        jp_ratio=args.jp_ratio,
+        code_density=args.code_density,
+        median_bytes=args.median_bytes,
+        size_sigma=args.size_sigma,
+        max_bytes=args.max_bytes,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='ベンチマーク用の合成ドキュメントツリーを生成')
+    parser.add_argument('--out', required=True, help='出力先（docs/ 以下に生成）')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    paths = generate_corpus(args.out, spec)
+    print(json.dumps({'out': os.path.abspath(args.out), 'documents': len(paths), 'spec': spec.to_dict()}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+# suite.py - ルートと主要な関数のベンチマークスイート
+# ====================================================
+#
+# 使い方:
+#   python -m benchmarks.suite --output results.json
+#   python -m benchmarks.suite --baseline results.json --threshold 0.15
+#   python -m benchmarks.suite --files 5000 --jp-ratio 0.8 --repo /path/to/old/checkout --output old.json
+#
+# 合成ツリーを生成し、クリーンなサブプロセスでapp.pyを読み込んで、Flaskのテストクライアントから
+# index・view_file・view_all・api_files・api_search（対応していればセクションのAPIも）を呼び出します。あわせて
+# get_md_files_structure・process_markdown・統計情報・検索インデックスを単体で計測します。
+# 結果はJSONで出力し、--baselineを指定すると中央値を比較して、
+# threshold（割合）を超えて遅くなった項目があれば終了コード1を返します。
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from benchmarks.corpus import add_arguments, generate_corpus, spec_from_args
+
+# 検索APIで計測するクエリ（英語・日本語・一致なし）
+SEARCH_QUERIES = {
+    'en': 'documentation',
+    'ja': '検索機能',
+    'none': 'zzzznotfound'
+}
+
+def summarize(samples):
+    """所要時間（ミリ秒）のリストから、最初の1回と全体の統計を求める"""
+    ordered = sorted(samples)
+    return {
+        'first_ms': round(samples[0], 3),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'runs': len(samples)
+    }
+
+def timed(func, repeat):
+    """funcをrepeat回実行して所要時間の統計を返す"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+def route_benchmarks(app_module, paths):
+    """テストクライアントで呼び出すルートの計測 (名前, 関数)"""
+    client = app_module.app.test_client()
+    largest = max(paths, key=os.path.getsize)
+
+    def get(url, headers=None):
+        response = client.get(url, headers=headers)
+        # ストリーミングのレスポンスも最後まで読み込む
+        response.get_data()
+        assert response.status_code in (200, 304), (url, response.status_code)
+        return response
+
+    benchmarks = [
+        ('index', lambda: get('/')),
+        ('view_file', lambda: get(f'/file/{paths[0]}')),
+        ('view_file.largest', lambda: get(f'/file/{largest}')),
+        ('view_all', lambda: get('/all')),
+        ('view_all.buffered', lambda: get('/all?stream=0')),
+        ('api_files', lambda: get('/api/files')),
+    ]
+    benchmarks.extend((f'api_search.{name}', lambda query=query: get(f'/api/search?q={query}'))
+                      for name, query in SEARCH_QUERIES.items())
+
+    # 見出しの索引に対応している場合は、遅延表示のページと1セクションの取得も計測する
+    if 'api_file_section' in app_module.app.view_functions:
+        headings = get(f'/api/file/{largest}/outline').get_json()['headings']
+        benchmarks.append(('view_file.largest.lazy', lambda: get(f'/file/{largest}?sections=lazy')))
+        if headings:
+            slug = headings[len(headings) // 2]['slug']
+            benchmarks.append(('api_file_section', lambda: get(f'/api/file/{largest}/section/{slug}')))
+
+    # ETagに対応している場合は再検証（304）も計測する
+    etag = get(f'/file/{paths[0]}').headers.get('ETag')
+    if etag:
+        benchmarks.append(('view_file.revalidate', lambda: get(f'/file/{paths[0]}', {'If-None-Match': etag})))
+    return benchmarks
+
+def micro_benchmarks(app_module, paths):
+    """関数単位の計測 (名前, 関数)。計測対象のチェックアウトにない関数は除く"""
+    with open(max(paths, key=os.path.getsize), 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    benchmarks = [('get_md_files_structure', app_module.get_md_files_structure)]
+
+    catalog = getattr(app_module, 'catalog', None)
+    if catalog is not None:
+        # カタログを持つ場合は、ディレクトリの再探索を強制した場合も計測する
+        benchmarks.append(('get_md_files_structure.rebuild', lambda: catalog.refresh(force=True)))
+
+    render_cache = getattr(app_module, 'render_cache', None)
+
+    def convert_uncached():
+        if render_cache is not None:
+            render_cache.clear()
+        app_module.process_markdown(content)
+
+    benchmarks.append(('process_markdown', convert_uncached))
+    if render_cache is not None:
+        benchmarks.append(('process_markdown.cached', lambda: app_module.process_markdown(content)))
+
+    try:
+        from text_stats import analyze_text
+        benchmarks.append(('text_stats', lambda: analyze_text(content)))
+    except ImportError:
+        benchmarks.append(('text_stats', lambda: (app_module.count_words(content),
+                                                  app_module.calculate_reading_time(content))))
+
+    if hasattr(app_module, 'search_index'):
+        from search_index import SearchIndex
+
+        def build_index():
+            SearchIndex().sync(app_module.get_md_files_structure(), 0)
+
+        benchmarks.append(('search_index.build', build_index))
+    return benchmarks
+
+def measure(repo, corpus, paths, repeat):
+    """サブプロセス内で呼ばれる計測本体"""
+    os.chdir(corpus)
+    # 計測対象にないモジュールをこのチェックアウトから読み込まないよう、
+    # スイート自身のディレクトリは検索パスから外してから対象を加える
+    sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != REPO_DIR]
+    sys.path.insert(0, repo)
+
+    started = time.perf_counter()
+    import app as app_module
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    # 監視スレッドは計測のじゃまになるため止める
+    watcher = getattr(app_module, 'docs_watcher', None)
+    if watcher is not None:
+        watcher.stop()
+
+    results = {'startup': summarize([startup_ms])}
+    for name, func in route_benchmarks(app_module, paths):
+        results[f'route.{name}'] = timed(func, repeat)
+    for name, func in micro_benchmarks(app_module, paths):
+        results[f'func.{name}'] = timed(func, repeat)
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    中央値をベースラインと比較します。
+    戻り値は項目ごとの {'baseline_ms', 'current_ms', 'change', 'regression'} の辞書です。
+    """
+    comparison = {}
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = 0.0
+        if previous['median_ms']:
+            change = (current['median_ms'] - previous['median_ms']) / previous['median_ms']
+        comparison[name] = {
+            'baseline_ms': previous['median_ms'],
+            'current_ms': current['median_ms'],
+            'change': round(change, 4),
+            'regression': change > threshold
+        }
+    return comparison
+
+def print_comparison(comparison, threshold):
+    print(f'{"benchmark":<36} {"baseline":>12} {"current":>12} {"change":>9}', file=sys.stderr)
+    for name, row in comparison.items():
+        mark = '  REGRESSION' if row['regression'] else ''
+        print(f'{name:<36} {row["baseline_ms"]:>10.3f}ms {row["current_ms"]:>10.3f}ms '
+              f'{row["change"] * 100:>+8.1f}%{mark}', file=sys.stderr)
+    print(f'threshold: +{threshold * 100:.1f}%', file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='ルートと主要な関数のベンチマーク')
+    add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5, help='各項目の実行回数')
+    parser.add_argument('--repo', default=REPO_DIR, help='計測対象のチェックアウト')
+    parser.add_argument('--corpus', help='既存の合成ツリーを再利用する（生成しない）')
+    parser.add_argument('--output', help='結果のJSONの保存先（省略時は標準出力）')
+    parser.add_argument('--baseline', help='比較するベースラインの結果のJSON')
+    parser.add_argument('--threshold', type=float, default=0.10, help='回帰とみなす中央値の増加の割合')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--paths', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        with open(args.paths, 'r', encoding='utf-8') as f:
+            paths = json.load(f)
+        print(json.dumps(measure(args.repo, args.corpus, paths, args.repeat)))
+        return 0
+
+    spec = spec_from_args(args)
+    corpus = args.corpus or tempfile.mkdtemp(prefix='md-bench-')
+    try:
+        if args.corpus:
+            # 既存のツリーではカタログの対象となるファイルを探す
+            paths = sorted(
+                os.path.relpath(os.path.join(root, name), corpus)
+                for root, _, names in os.walk(os.path.join(corpus, 'docs'))
+                for name in names if name.endswith('.md') and name[:1].isdigit()
+            )
+        else:
+            paths = generate_corpus(corpus, spec)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(paths, f)
+            paths_file = f.name
+        try:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure',
+                 '--repo', os.path.abspath(args.repo), '--corpus', corpus,
+                 '--paths', paths_file, '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+        finally:
+            os.remove(paths_file)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'repo': os.path.abspath(args.repo),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'documents': len(paths),
+            'repeat': args.repeat,
+            'corpus': spec.to_dict() if not args.corpus else os.path.abspath(args.corpus)
+        },
+        'results': json.loads(output.strip().splitlines()[-1])
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(report['results'], baseline['results'], args.threshold)
+        print_comparison(report['comparison'], args.threshold)
+        regressions = [name for name, row in report['comparison'].items() if row['regression']]
+
+    serialized = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(serialized + '\n')
+    else:
+        print(serialized)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# build.py - 静的サイトの書き出し
+# ================================
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+from flask import url_for
+
+from catalog import read_digests
+from render_cache import RenderCache, config_digest, tree_digest
+from rendering import init_worker, render_document
+
+# 前回のビルド内容を記録するファイル（キャッシュの保存先に保存）
+BUILD_MANIFEST = 'manifest.json'
+# ビルドのキャッシュの保存先（出力先ごとに、この下の出力先のパスのハッシュのディレクトリを使う）
+BUILD_CACHE_ROOT = os.path.join('.cache', 'build')
+# 変換済みHTMLを次回のビルドで再利用するためのキャッシュ（キャッシュの保存先からの相対パス）
+BUILD_RENDER_CACHE_DIR = 'render'
+# ワーカー1つあたりに同時に渡すドキュメント数
+BUILD_PREFETCH = 4
+
+def output_path(url):
+    """
+    URLに対応する出力ファイルのパスを返す。
+    静的サーバーでは `try_files $uri $uri.html $uri.json` のように解決します。
+    """
+    if url == '/':
+        return 'index.html'
+    if url.startswith('/api/'):
+        return url.lstrip('/') + '.json'
+    return url.lstrip('/') + '.html'
+
+def write_output(out_dir, relative_path, data):
+    """出力先にファイルを書き込む（途中の状態を読まれないよう一時ファイルから置き換える）"""
+    path = os.path.join(out_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def default_cache_dir(out_dir):
+    """出力先に対応するキャッシュの保存先（出力先の外に置き、書き出すファイルに含めない）"""
+    key = hashlib.sha256(os.path.abspath(out_dir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(BUILD_CACHE_ROOT, key)
+
+def load_manifest(cache_dir):
+    """前回のビルドのマニフェストを読み込む（なければ空）"""
+    try:
+        with open(os.path.join(cache_dir, BUILD_MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+class BuildReport:
+    """ステージごとの所要時間と件数を記録する"""
+    def __init__(self):
+        self.stages = []
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def print(self):
+        total = sum(seconds for _, seconds in self.stages)
+        for name, seconds in self.stages:
+            print(f"  {name:<10} {seconds * 1000:10.1f} ms")
+        print(f"  {'total':<10} {total * 1000:10.1f} ms")
+        print('  ' + ', '.join(f'{name}: {count}' for name, count in self.counts.items()))
+
+class SiteBuilder:
+    """
+    アプリケーションの各ページを静的なHTML/JSONとして書き出す。
+    ページはテストクライアント経由で既存のルートとテンプレートから生成し、
+    マニフェストに記録したキー（内容のハッシュ等）が変わったものだけを書き直します。
+    Markdownの変換はプロセスプールで並列に行い、結果とマニフェストは出力先の外のキャッシュに保存します。
+    """
+    def __init__(self, site, out_dir, workers=None, force=False, cache_dir=None):
+        # siteはapp.pyのモジュール（__main__として実行されている場合も同じものを使う）
+        self.site = site
+        self.out_dir = out_dir
+        self.cache_dir = cache_dir or default_cache_dir(out_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.force = force
+        self.report = BuildReport()
+        self.manifest = {} if force else load_manifest(self.cache_dir)
+        self.pages = {}
+        self.render_cache = RenderCache(
+            max_entries=site.RENDER_CACHE_MAX_ENTRIES,
+            max_bytes=site.RENDER_CACHE_MAX_BYTES,
+            cache_dir=os.path.join(self.cache_dir, BUILD_RENDER_CACHE_DIR)
+        )
+
+    def build(self):
+        """サイト全体を書き出す"""
+        site = self.site
+        # ビルド中はルートの変換結果をビルドのキャッシュから返す
+        site.render_cache = self.render_cache
+        # 静的サイトには検索APIがないため、ページからサーバー検索を外す
+        site.app.config['STATIC_EXPORT'] = True
+
+        with self.report.stage('scan'):
+            site.catalog.refresh(force=True)
+            files = site.catalog.get_files()
+
+        with self.report.stage('hash'):
+            digests = self._hash_documents(files)
+
+        with self.report.stage('convert'):
+            self._convert(files, digests)
+
+        site_key = config_digest(
+            site.RENDER_CONFIG_KEY,
+            tree_digest(site.app.template_folder),
+            site.get_stylesheet().digest,
+            [(f.path, f.name, f.size, f.modified) for f in files]
+        )
+        with site.app.test_client() as client:
+            with self.report.stage('pages'):
+                for file_info in files:
+                    if file_info.path in digests:
+                        key = config_digest(site_key, digests[file_info.path])
+                        # 静的サイトにはセクションのAPIがないため、長いファイルも遅延させずに書き出す
+                        self._render(client, self._file_url(file_info.path), key, query='?sections=all')
+                        if site.is_large_file(file_info):
+                            self._render_continuations(client, file_info, key)
+
+            with self.report.stage('combined'):
+                self._render(client, '/all', config_digest(site_key, digests), query='?stream=0')
+
+            with self.report.stage('index'):
+                self._render(client, '/', site_key)
+                self._render(client, '/api/files', site_key)
+                self._export_search_index(files, digests)
+
+            with self.report.stage('assets'):
+                self._copy_static(client)
+
+        with self.report.stage('cleanup'):
+            self._remove_stale_pages()
+            write_output(self.cache_dir, BUILD_MANIFEST,
+                         json.dumps({'pages': self.pages}, indent=2, sort_keys=True).encode('utf-8'))
+
+        return self.report
+
+    def _hash_documents(self, files):
+        """各ドキュメントの内容のハッシュを計算"""
+        digests = {}
+        for file_info, digest in zip(files, read_digests(files, self.site.SCAN_WORKERS)):
+            if digest is None:
+                print(f"Warning: Could not read file {file_info.path}")
+                continue
+            digests[file_info.path] = digest
+        return digests
+
+    def _convert(self, files, digests):
+        """
+        キャッシュにないドキュメントだけをプロセスプールで変換
+        大きなファイルはページの書き出し時に表示する部分だけを変換するため対象外です。
+        """
+        config_key = self.site.RENDER_CONFIG_KEY
+        candidates = [
+            file_info for file_info in files
+            if file_info.path in digests and not self.site.is_large_file(file_info)
+        ]
+        changed = [
+            file_info for file_info in candidates
+            if self.render_cache.get(f'{config_key}-{digests[file_info.path]}') is None
+        ]
+        self.report.count('reused', len(candidates) - len(changed))
+        if not changed:
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker) as executor:
+            pending = {}
+            for file_info in changed:
+                try:
+                    content = file_info.read_content()
+                except (IOError, OSError, ValueError) as e:
+                    print(f"Warning: Could not read file {file_info.path}: {e}")
+                    continue
+                key = self.render_cache.make_key(content, config_key)
+                pending[executor.submit(render_document, content)] = (file_info, key)
+                if len(pending) >= self.workers * BUILD_PREFETCH:
+                    self._collect(pending, FIRST_COMPLETED)
+            self._collect(pending)
+
+    def _collect(self, pending, return_when=ALL_COMPLETED):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            file_info, key = pending.pop(future)
+            try:
+                self.render_cache.put(key, future.result()[0])
+                self.report.count('converted')
+            except Exception as e:
+                print(f"Warning: Could not convert file {file_info.path}: {e}")
+
+    def _file_url(self, path):
+        with self.site.app.test_request_context():
+            return url_for('view_file', file_path=path)
+
+    def _is_current(self, url, key):
+        self.pages[url] = key
+        return self.manifest.get('pages', {}).get(url) == key and os.path.exists(
+            os.path.join(self.out_dir, output_path(url)))
+
+    def _render(self, client, url, key, query='', source=None):
+        """
+        ページのキーが前回と異なる場合だけ取得して書き出す
+        sourceを指定した場合は、そのURLから取得した内容をurlのページとして書き出します。
+        """
+        if self._is_current(url, key):
+            self.report.count('skipped')
+            return
+        response = client.get((source or url) + query)
+        if response.status_code != 200:
+            print(f"Warning: Could not render {url}: HTTP {response.status_code}")
+            self.pages.pop(url)
+            return
+        write_output(self.out_dir, output_path(url), response.get_data())
+        self.report.count('written')
+
+    def _render_continuations(self, client, file_info, key):
+        """
+        大きなファイルの続き（`?offset=`）のページを、続きごとに別のファイルとして書き出す
+        ページの区切りはアプリと同じく、LARGE_FILE_CHUNK_BYTESずつ段落の区切りで求めます。
+        """
+        file_url = self._file_url(file_info.path)
+        offset = 0
+        while True:
+            try:
+                _, offset = file_info.read_chunk(offset, self.site.LARGE_FILE_CHUNK_BYTES)
+            except (IOError, OSError, ValueError) as e:
+                print(f"Warning: Could not split file {file_info.path}: {e}")
+                return
+            if offset is None:
+                return
+            with self.site.app.test_request_context():
+                url = self.site.continuation_url(file_info, offset)
+            self._render(client, url, config_digest(key, offset),
+                         query=f'?sections=all&offset={offset}', source=file_url)
+
+    def _export_search_index(self, files, digests):
+        """検索インデックスをJSONとして書き出す"""
+        url = '/api/search-index'
+        if self._is_current(url, config_digest(sorted(digests.items()))):
+            self.report.count('skipped')
+            return
+        self.site.search_index.sync(files, self.site.catalog.version)
+        exported = self.site.search_index.export()
+        names = {file_info.path: file_info.name for file_info in files}
+        exported['documents'] = [
+            {'path': path, 'name': names[path], 'url': self._file_url(path)}
+            for path in exported['documents']
+        ]
+        write_output(self.out_dir, output_path(url),
+                     json.dumps(exported, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        self.report.count('written')
+
+    def _copy_static(self, client):
+        """静的ファイルをコピーし、CSSはアプリと同じ方法でコンパイルする"""
+        static_folder = self.site.app.static_folder
+        shutil.copytree(static_folder, os.path.join(self.out_dir, 'static'),
+                        ignore=shutil.ignore_patterns('scss', '*.map'), dirs_exist_ok=True)
+        with self.site.app.test_request_context():
+            urls = ['/static/css/main.css', self.site.stylesheet_url()]
+        for url in urls:
+            response = client.get(url)
+            write_output(self.out_dir, url.lstrip('/'), response.get_data())
+
+    def _remove_stale_pages(self):
+        """前回は書き出したが今回は存在しないページを削除"""
+        for url in self.manifest.get('pages', {}):
+            if url in self.pages:
+                continue
+            try:
+                os.remove(os.path.join(self.out_dir, output_path(url)))
+                self.report.count('removed')
+            except OSError:
+                pass
+
+def main(site, argv):
+    """`python app.py build` のエントリーポイント"""
+    parser = argparse.ArgumentParser(prog='app.py build', description='Export the docs tree as a static site')
+    parser.add_argument('--out', default='dist', help='output directory (default: dist)')
+    parser.add_argument('--workers', type=int, default=None, help='conversion processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='ignore the previous build and render everything')
+    parser.add_argument('--cache-dir', default=None,
+                        help=f'where to keep the manifest and rendered HTML (default: {BUILD_CACHE_ROOT}/<hash of --out>)')
+    args = parser.parse_args(argv)
+
+    # ビルド中にファイルを書き出しても監視スレッドが反応しないよう止めておく
+    site.docs_watcher.stop()
+    builder = SiteBuilder(site, args.out, workers=args.workers, force=args.force, cache_dir=args.cache_dir)
+    report = builder.build()
+    print(f"Built {args.out}")
+    report.print()
+    return 0
@@ -0,0 +1,674 @@
+# catalog.py - ドキュメントカタログ
+# ==================================
+
+import functools
+import io
+import mmap
+import operator
+import os
+import re
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from render_cache import content_digest, file_digest
+
+# 探索から除外するディレクトリ
+EXCLUDED_DIRS = ['.venv', '__pycache__', '.git', 'node_modules', 'static', 'templates', '.cache', 'dist']
+
+# ファイル名の番号付き接頭辞
+PREFIX_PATTERN = re.compile(r'^(\d+)_')
+
+# このサイズ以上の本文はmmap経由で読み込み、FileInfoには保持しない
+MMAP_THRESHOLD = 1024 * 1024
+
+# ディスクから読み込んだ本文の累計（メトリクス用）
+read_stats = {'files': 0, 'bytes': 0}
+_read_stats_lock = threading.Lock()
+
+def count_read(size):
+    """本文の読み込みを記録"""
+    with _read_stats_lock:
+        read_stats['files'] += 1
+        read_stats['bytes'] += size
+
+def read_text(full_path, use_mmap=False):
+    """ファイルをUTF-8テキストとして読み込む"""
+    if use_mmap:
+        with open(full_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            count_read(size)
+            if size == 0:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, 'utf-8')
+    with open(full_path, 'r', encoding='utf-8') as f:
+        count_read(os.fstat(f.fileno()).st_size)
+        return f.read()
+
+def read_text_chunk(full_path, start=0, max_bytes=MMAP_THRESHOLD):
+    """
+    ファイルのstartバイト目から最大max_bytesを読み込み、(テキスト, 続きの位置) を返します。
+    途中で切る場合は段落（空行）、なければ行の区切りで切ります（改行がなければ文字の区切り）。
+    続きがない場合、位置はNoneです。
+    """
+    with open(full_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(max_bytes + 1)
+    count_read(len(data))
+    if len(data) <= max_bytes:
+        return data.decode('utf-8'), None
+
+    cut = data.rfind(b'\n\n', 0, max_bytes)
+    if cut != -1:
+        cut += 2
+    else:
+        cut = data.rfind(b'\n', 0, max_bytes) + 1
+    if cut == 0:
+        # UTF-8の継続バイトの前では切らない
+        cut = max_bytes
+        while cut > 1 and data[cut] & 0xC0 == 0x80:
+            cut -= 1
+    return data[:cut].decode('utf-8'), start + cut
+
+class FileInfo:
+    """
+    ファイル情報を保持するクラス。
+    大きなカタログでも常駐できるよう__slots__で属性を固定し、stat情報は数値のまま保持します。
+    表示用のサイズと更新日時はテンプレートなどから参照されたときに整形します。
+    rootを指定した場合、本文は最初に.contentへアクセスした時点で読み込みます。
+    """
+    __slots__ = ('path', 'name', 'root', 'size_bytes', 'mtime_ns', 'sort_key', '_content', '_digest')
+
+    def __init__(self, path, name, content=None, root=None, size_bytes=0, mtime_ns=0, sort_key=(), digest=None):
+        self.path = path
+        self.name = name
+        # ドキュメントディレクトリ（カタログ内のすべてのエントリで同じ文字列を共有する）
+        self.root = root
+        self.size_bytes = size_bytes
+        self.mtime_ns = mtime_ns
+        self.sort_key = sort_key
+        self._content = content if content is not None or root is not None else ''
+        # 計算済みのダイジェスト（スナップショットから復元した場合など）
+        self._digest = digest
+
+    @property
+    def full_path(self):
+        """ファイルのパス（ファイルに対応しない場合はNone）"""
+        if self.root is None:
+            return None
+        return os.path.join(self.root, self.path)
+
+    @property
+    def size(self):
+        """表示用のファイルサイズ"""
+        return format_file_size(self.size_bytes) if self.root is not None else ''
+
+    @property
+    def modified(self):
+        """表示用の更新日時"""
+        return format_datetime(self.mtime_ns / 1e9) if self.root is not None else ''
+
+    @property
+    def stats(self):
+        """表示用の統計情報（ファイルに対応しない場合はNone）"""
+        if self.root is None:
+            return None
+        return {
+            'size': self.size,
+            'modified': self.modified
+        }
+
+    @property
+    def content(self):
+        """本文（未読み込みならここで読み込む）"""
+        if self._content is not None:
+            return self._content
+        if self.size_bytes >= MMAP_THRESHOLD:
+            # 大きな本文は保持せず、アクセスのたびにmmapから読み込む
+            return read_text(self.full_path, use_mmap=True)
+        self._content = read_text(self.full_path)
+        return self._content
+
+    def read_chunk(self, start=0, max_bytes=MMAP_THRESHOLD):
+        """本文の一部を (テキスト, 続きの位置) で返す（本文全体は読み込まない）"""
+        return read_text_chunk(self.full_path, start, max_bytes)
+
+    def read_range(self, start, end):
+        """本文のstartバイト目からendバイト目の手前までを返す（本文全体は読み込まない）"""
+        if self._content is not None:
+            return self._content.encode('utf-8')[start:end].decode('utf-8')
+        with open(self.full_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        count_read(len(data))
+        return data.decode('utf-8')
+
+    def iter_lines(self):
+        """本文をUTF-8のバイト列で1行ずつ返す（本文全体は保持しない）"""
+        if self._content is not None:
+            yield from io.BytesIO(self._content.encode('utf-8'))
+            return
+        size = 0
+        with open(self.full_path, 'rb') as f:
+            for line in f:
+                size += len(line)
+                yield line
+        count_read(size)
+
+    def read_content(self):
+        """本文を返す（未読み込みの場合も保持はしない）"""
+        if self._content is not None:
+            return self._content
+        return read_text(self.full_path, use_mmap=self.size_bytes >= MMAP_THRESHOLD)
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._digest = None
+
+    @property
+    def digest(self):
+        """本文のダイジェスト（最初のアクセス時に計算して保持する）"""
+        if self._digest is None:
+            if self._content is None and self.size_bytes >= MMAP_THRESHOLD:
+                # 大きな本文はテキストに変換せず、ブロックごとにハッシュを計算する
+                self._digest = file_digest(self.full_path)
+                count_read(self.size_bytes)
+            else:
+                self._digest = content_digest(self.read_content())
+        return self._digest
+
+    @property
+    def content_loaded(self):
+        """本文がメモリ上に読み込まれているか"""
+        return self._content is not None
+
+    @property
+    def digest_loaded(self):
+        """ダイジェストを計算済みか"""
+        return self._digest is not None
+
+    def reuse_digest(self, previous):
+        """更新時刻とサイズが同じ以前のエントリから、計算済みのダイジェストを引き継ぐ"""
+        if (self._digest is None and previous._digest is not None
+                and (previous.mtime_ns, previous.size_bytes) == (self.mtime_ns, self.size_bytes)):
+            self._digest = previous._digest
+
+    def restore_digest(self, mtime_ns, size_bytes, digest):
+        """スナップショットに記録された更新時刻とサイズが現在と同じ場合だけ、記録のダイジェストを使う"""
+        if self._digest is None and (mtime_ns, size_bytes) == (self.mtime_ns, self.size_bytes):
+            self._digest = digest
+
+def format_file_size(size_bytes):
+    """ファイルサイズを人間が読みやすい形式に変換"""
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes // 1024} KB"
+    else:
+        return f"{size_bytes // (1024 * 1024)} MB"
+
+def format_datetime(timestamp):
+    """タイムスタンプを人間が読みやすい形式に変換"""
+    dt = datetime.fromtimestamp(timestamp)
+    return dt.strftime('%Y-%m-%d %H:%M')
+
+def stat_signature(stat_info):
+    """変更検知に使うstat情報の組を返す"""
+    return (stat_info.st_mtime_ns, stat_info.st_ino, stat_info.st_size)
+
+@functools.lru_cache(maxsize=4096)
+def _directory_sort_key(directory):
+    """ディレクトリ部分のソートキー（同じディレクトリのファイル間で共有する）"""
+    if not directory:
+        return (), ()
+    parent_numbers, parent_walk = _directory_sort_key(os.path.dirname(directory))
+    part = sys.intern(os.path.basename(directory))
+    match = PREFIX_PATTERN.match(part)
+    return parent_numbers + (int(match.group(1)) if match else 999,), parent_walk + ((1, part),)
+
+def make_sort_key(relative_path):
+    """
+    ソート用のキーを生成します。
+    パスの各要素の番号接頭辞（番号なしは999）を優先し、番号が同じ場合は
+    ディレクトリの探索順（同じ階層ではファイルが先、それぞれ名前順）で並べます。
+    """
+    directory, filename = os.path.split(relative_path)
+    numbers, walk_order = _directory_sort_key(directory)
+    match = PREFIX_PATTERN.match(filename)
+    return (numbers + (int(match.group(1)) if match else 999,), walk_order + ((0, filename),))
+
+def is_document_path(relative_path):
+    """カタログの対象となるMarkdownファイルのパスか判定"""
+    parts = relative_path.split(os.sep)
+    if parts[0] == os.pardir or any(part in EXCLUDED_DIRS for part in parts[:-1]):
+        return False
+    # 接頭辞に番号がついていない場合は対象外
+    return parts[-1].endswith('.md') and PREFIX_PATTERN.match(parts[-1]) is not None
+
+def make_file_info(docs_dir, relative_path, stat_info):
+    """stat情報からFileInfoを作成（本文は読み込まない）"""
+    filename = os.path.basename(relative_path)
+    match = PREFIX_PATTERN.match(filename)
+
+    # 表示用のファイル名（接頭辞を除去）
+    clean_name = filename[len(match.group(0)):].replace('.md', '')
+
+    return FileInfo(
+        path=relative_path,
+        name=clean_name,
+        root=docs_dir,
+        size_bytes=stat_info.st_size,
+        mtime_ns=stat_info.st_mtime_ns,
+        sort_key=make_sort_key(relative_path)
+    )
+
+def scan_directory(docs_dir, directory, relative_dir):
+    """
+    1つのディレクトリのエントリを読み込み、(FileInfoのリスト, シグネチャ, サブディレクトリ) を返します。
+    サブディレクトリは (パス, 相対パス) のリストです。stat情報はDirEntryから取得し、
+    同じエントリに対してシグネチャとFileInfoで使い回します。
+    """
+    files = []
+    signature = {}
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return files, signature, subdirs
+
+    for entry in entries:
+        relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            # os.walkと同じくシンボリックリンクのディレクトリはたどらない
+            if entry.name in EXCLUDED_DIRS or entry.is_symlink():
+                continue
+            # ディレクトリのmtimeはエントリの追加・削除・リネームで変化する
+            try:
+                signature[entry.path] = stat_signature(entry.stat())
+            except OSError:
+                continue
+            subdirs.append((entry.path, relative_path))
+            continue
+
+        # 接頭辞に番号がついていない場合は対象外
+        if not entry.name.endswith('.md') or PREFIX_PATTERN.match(entry.name) is None:
+            continue
+
+        try:
+            stat_info = entry.stat()
+        except OSError as e:
+            print(f"Warning: Could not stat file {entry.path}: {e}")
+            continue
+        files.append(make_file_info(docs_dir, relative_path, stat_info))
+        signature[entry.path] = stat_signature(stat_info)
+
+    return files, signature, subdirs
+
+def scan_md_files(docs_dir, workers=1):
+    """
+    ディレクトリを再帰的に探索し、.mdファイルの情報をリストで取得します。
+    ファイル名のプレフィックスはソートにのみ使用し、表示用の名前からは除去します。
+    メタデータはstat情報のみから作成し、本文は読み込みません。
+    workersが2以上の場合は、サブディレクトリをスレッドプールで並行して探索します
+    （ネットワークファイルシステムなど、1回のstatに時間がかかる場合に有効です）。
+    戻り値は (FileInfoのリスト, 検証用シグネチャの辞書) です。
+    シグネチャには探索したディレクトリとファイルのstat情報が含まれます。
+    """
+    md_files_info = []
+    try:
+        signature = {docs_dir: stat_signature(os.stat(docs_dir))}
+    except OSError:
+        return md_files_info, {}
+
+    def merge(result):
+        files, directory_signature, subdirs = result
+        md_files_info.extend(files)
+        signature.update(directory_signature)
+        return subdirs
+
+    if workers <= 1:
+        pending = [(docs_dir, '')]
+        while pending:
+            pending.extend(merge(scan_directory(docs_dir, *pending.pop())))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catalog-scan') as executor:
+            futures = {executor.submit(scan_directory, docs_dir, docs_dir, '')}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    futures.update(executor.submit(scan_directory, docs_dir, *subdir)
+                                   for subdir in merge(future.result()))
+
+    # ソート（キーは探索順によらず一意に決まる）
+    md_files_info.sort(key=operator.attrgetter('sort_key'))
+
+    return md_files_info, signature
+
+def read_digests(files, workers=1):
+    """
+    各ファイルの本文のダイジェストを返します（読み込めないファイルはNone）。
+    未計算のファイルが複数ある場合は、同時に最大workers個まで並行して読み込みます。
+    """
+    def digest(file_info):
+        try:
+            return file_info.digest
+        except (IOError, OSError, ValueError):
+            return None
+
+    missing = sum(1 for file_info in files if not file_info.digest_loaded)
+    if workers <= 1 or missing <= 1:
+        return [digest(file_info) for file_info in files]
+    with ThreadPoolExecutor(max_workers=min(workers, missing), thread_name_prefix='catalog-read') as executor:
+        return list(executor.map(digest, files))
+
+class DocumentCatalog:
+    """
+    プロセス全体で共有するドキュメントカタログ。
+    一度構築したファイル一覧を保持し、ディレクトリとファイルのstat情報
+    （mtime・inode・サイズ）が変化したときだけ再構築します。
+    watchedがTrueの間は再検証を行わず、監視スレッドからの
+    apply_changes()/refresh()で更新されます。
+    storeを指定すると、最初のアクセスではディレクトリを探索せずにスナップショットから
+    一覧を復元し、前回からの変更はバックグラウンドで確認します。
+    一覧が変わると、save_delay秒の間の変更をまとめてスナップショットをバックグラウンドで保存します。
+    """
+    def __init__(self, docs_dir, revalidate_interval=1.0, scan_workers=1, store=None, save_delay=5.0):
+        self.docs_dir = docs_dir
+        # この秒数以内の再検証はstatも行わずキャッシュを返す
+        self.revalidate_interval = revalidate_interval
+        # 再構築時にディレクトリを並行して探索するスレッド数
+        self.scan_workers = scan_workers
+        # スナップショットの保存先（CatalogStore、Noneで無効）
+        self.store = store
+        self.save_delay = save_delay
+        self.snapshot_loaded = False
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.last_build_seconds = 0.0
+        self.last_build_files = 0
+        # 追跡しているファイルとディレクトリの最新の更新時刻（ナノ秒）
+        # ファイルの削除やリネームでも親ディレクトリの更新時刻が変わるため、一覧の変更で必ず進みます
+        self.modified_ns = 0
+        self.watched = False
+        self._files = None
+        # パスからリスト内の位置への索引（_filesと同時に差し替える）
+        self._positions = {}
+        self._signature = {}
+        # スナップショットから復元し、まだ検証していないダイジェスト（パス → (更新時刻, サイズ, ダイジェスト)）
+        self._restored_digests = {}
+        # スナップショットをバックグラウンドで検証中か（その間は再検証せずにスナップショットの一覧を返す）
+        self._validating = False
+        self._validated_at = 0.0
+        self._saved_state = None
+        self._save_timer = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def get_files(self):
+        """最新のFileInfoリストを返す（変更がなければ同じリストを返す）"""
+        return self._current()[0]
+
+    def snapshot(self):
+        """
+        再検証も再構築も行わずに、構築済みのFileInfoリストを返します（未構築ならNone）。
+        エラーページのように、ディスクを読みたくない場面で使います。
+        """
+        return self._files
+
+    def locate(self, path):
+        """
+        最新のFileInfoリストと、その中でのpathの位置（0始まり）を返します。
+        位置は索引から求めるため、リストを走査しません。見つからない場合はNoneです。
+        """
+        files, positions = self._current()
+        return files, positions.get(path)
+
+    def _current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._files is not None:
+                if self.watched or self._validating or now - self._validated_at < self.revalidate_interval:
+                    self.hits += 1
+                    return self._files, self._positions
+                if not self._is_stale():
+                    self._validated_at = now
+                    self.hits += 1
+                    return self._files, self._positions
+
+            if self._files is None and self.store is not None and self._load_snapshot():
+                self.hits += 1
+                return self._files, self._positions
+
+            self.misses += 1
+            self._rebuild()
+            return self._files, self._positions
+
+    def apply_changes(self, full_paths):
+        """
+        変更のあったファイルのパスをカタログに反映します（追加・更新・削除）。
+        ディレクトリが含まれる場合は全体を再構築します。
+        """
+        with self._lock:
+            if self._files is None:
+                return
+
+            files = {file_info.path: file_info for file_info in self._files}
+            changed = False
+            for path in full_paths:
+                # os.walkと同じ形式のパスに揃える
+                relative_path = os.path.relpath(path, self.docs_dir)
+                full_path = os.path.join(self.docs_dir, relative_path)
+                try:
+                    stat_info = os.stat(full_path)
+                except OSError:
+                    stat_info = None
+
+                if stat_info is not None and stat.S_ISDIR(stat_info.st_mode):
+                    self._rebuild()
+                    return
+                if not is_document_path(relative_path):
+                    continue
+
+                self._refresh_signature(os.path.dirname(full_path))
+                if stat_info is None:
+                    # 削除（またはリネーム元）
+                    self._signature.pop(full_path, None)
+                    changed = files.pop(relative_path, None) is not None or changed
+                    continue
+
+                self._signature[full_path] = stat_signature(stat_info)
+                current = files.get(relative_path)
+                if current is not None and (current.mtime_ns, current.size_bytes) == (
+                        stat_info.st_mtime_ns, stat_info.st_size):
+                    continue
+                files[relative_path] = make_file_info(self.docs_dir, relative_path, stat_info)
+                changed = True
+
+            if changed:
+                self._set_files(sorted(files.values(), key=lambda f: f.sort_key))
+                self.version += 1
+                self._save_in_background()
+
+    def refresh(self, force=False):
+        """変更があれば（forceの場合は無条件に）カタログを再構築する"""
+        with self._lock:
+            if force or self._files is None or self._is_stale():
+                self._rebuild()
+                return True
+            self._validated_at = time.monotonic()
+            return False
+
+    def save_snapshot(self):
+        """
+        現在の一覧をスナップショットに保存します（前回の保存から変化がなければ何もしません）。
+        その後に計算したダイジェストも保存されるよう、終了時にも呼び出します。
+        """
+        if self.store is None:
+            return False
+        with self._save_lock:
+            with self._lock:
+                self._save_timer = None
+                if self._files is None:
+                    return False
+                files = self._files
+                signature = dict(self._signature)
+                version = self.version
+            state = (version, sum(1 for file_info in files if file_info.digest_loaded))
+            if state == self._saved_state:
+                return False
+            saved = self.store.save(self.docs_dir, files, signature)
+            if saved:
+                self._saved_state = state
+            return saved
+
+    def invalidate(self):
+        """次回のアクセスで再検証を強制する"""
+        with self._lock:
+            self._validated_at = 0.0
+
+    def stats(self):
+        """カタログの利用状況を返す"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds,
+                'version': self.version,
+                'files': len(self._files) if self._files is not None else 0,
+                'tracked_paths': len(self._signature),
+                'watched': self.watched,
+                'last_build_ms': round(self.last_build_seconds * 1000, 2),
+                'last_build_files_per_second': round(self.last_build_files / self.last_build_seconds)
+                if self.last_build_seconds else 0,
+                'scan_workers': self.scan_workers,
+                'snapshot_loaded': self.snapshot_loaded
+            }
+
+    def _is_stale(self, signatures=None):
+        """記録済みのstat情報（省略時は現在のシグネチャ）と現在の状態を比較する"""
+        for path, signature in (self._signature if signatures is None else signatures).items():
+            try:
+                if stat_signature(os.stat(path)) != signature:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _refresh_signature(self, path):
+        if path in self._signature:
+            try:
+                self._signature[path] = stat_signature(os.stat(path))
+            except OSError:
+                self._signature.pop(path, None)
+
+    def _set_files(self, files):
+        """一覧を差し替える（シグネチャは先に更新しておく）"""
+        self._files = files
+        self._positions = {file_info.path: i for i, file_info in enumerate(files)}
+        self.modified_ns = max((mtime_ns for mtime_ns, _, _ in self._signature.values()), default=0)
+
+    def _scan(self):
+        """ディレクトリを探索して (FileInfoのリスト, シグネチャ) を返す"""
+        started = time.perf_counter()
+        files, signature = scan_md_files(self.docs_dir, self.scan_workers)
+        self.last_build_seconds = time.perf_counter() - started
+        self.last_build_files = len(files)
+        return files, signature
+
+    def _rebuild(self, scanned=None):
+        """一覧を再構築する（scannedに探索済みの結果を渡した場合はそれに差し替える）"""
+        files, signature = scanned or self._scan()
+
+        # 変更のないファイルは計算済みのダイジェストを引き継ぐ
+        if self._files is not None:
+            for file_info in files:
+                position = self._positions.get(file_info.path)
+                if position is not None:
+                    file_info.reuse_digest(self._files[position])
+
+        self._signature = signature
+        self._set_files(files)
+        self._validated_at = time.monotonic()
+        self.rebuilds += 1
+        self.version += 1
+        self._save_in_background()
+
+    def _load_snapshot(self):
+        """スナップショットから一覧を復元し、前回からの変更の確認をバックグラウンドで始める"""
+        loaded = self.store.load(self.docs_dir)
+        if loaded is None:
+            return False
+        files, signature, digests = loaded
+        self._restored_digests = {
+            file_info.path: (file_info.mtime_ns, file_info.size_bytes, digests[file_info.path])
+            for file_info in files if file_info.path in digests
+        }
+        self._signature = signature
+        self._set_files(files)
+        self._validated_at = time.monotonic()
+        self.version += 1
+        self._saved_state = (self.version, len(self._restored_digests))
+        self.snapshot_loaded = True
+        self._validating = True
+        # ロックを解放した後に、stat情報を比較して変更があれば再構築する
+        threading.Thread(target=self._validate_snapshot, name='catalog-validate', daemon=True).start()
+        return True
+
+    def _validate_snapshot(self):
+        """
+        復元した一覧をstat情報と比較し（変更があれば再探索し）、その後で復元したダイジェストを使い始めます。
+        比較と探索はロックの外で行い、その間のリクエストにはスナップショットの一覧を返します。
+        検証前のダイジェストはETagや統計情報・見出しの索引のキャッシュのキーに使わないよう、
+        FileInfoには設定せずに保持しておき、更新時刻とサイズが記録と同じファイルにだけ設定します。
+        """
+        with self._lock:
+            files = self._files
+            signature = dict(self._signature)
+        try:
+            scanned = self._scan() if self._is_stale(signature) else None
+        except Exception as e:
+            print(f"Warning: Could not validate catalog snapshot: {e}")
+            with self._lock:
+                # 復元したダイジェストは使わず、次回のアクセスで再検証する
+                self._validating = False
+                self._restored_digests = {}
+                self._validated_at = 0.0
+            return
+
+        with self._lock:
+            self._validating = False
+            restored, self._restored_digests = self._restored_digests, {}
+            if self._files is not files:
+                # 検証中に監視スレッドが一覧を更新した場合、探索結果は古い可能性があるため探索し直す
+                if scanned is not None:
+                    self._rebuild()
+            elif scanned is not None:
+                self._rebuild(scanned)
+            else:
+                self._validated_at = time.monotonic()
+            for file_info in self._files:
+                entry = restored.get(file_info.path)
+                if entry is not None:
+                    file_info.restore_digest(*entry)
+
+    def _save_in_background(self):
+        """保存を予約する（予約済みならその保存にまとめる）"""
+        if self.store is None or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.save_snapshot)
+        self._save_timer.name = 'catalog-save'
+        self._save_timer.daemon = True
+        self._save_timer.start()
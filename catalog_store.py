@@ -0,0 +1,179 @@
+# catalog_store.py - カタログのスナップショット（SQLite）
+# ======================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from catalog import FileInfo, make_sort_key
+from text_stats import STATS_CACHE_SIZE, TextStats, cached_text_stats, store_text_stats
+
+# ソートキーの列の形式（dumpsは呼び出しごとにエンコーダーを作るため使い回す）
+_encode_sort_key = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+# スキーマを変更したら上げる（古いスナップショットは破棄して作り直す）
+SCHEMA_VERSION = 1
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+    '''CREATE TABLE IF NOT EXISTS files (
+        position INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL,
+        sort_key TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest TEXT,
+        cjk_chars INTEGER,
+        latin_words INTEGER,
+        word_count INTEGER,
+        reading_time INTEGER
+    )''',
+    '''CREATE TABLE IF NOT EXISTS signatures (
+        path TEXT PRIMARY KEY,
+        mtime_ns INTEGER NOT NULL,
+        ino TEXT NOT NULL,
+        size INTEGER NOT NULL
+    )'''
+]
+
+class CatalogStore:
+    """
+    カタログのスナップショットを保存するSQLiteファイル。
+    ファイルごとのパス・ソートキー・サイズ・更新時刻・本文のダイジェスト・単語数・読書時間と、
+    変更検知用のstat情報を保持します。
+    WALモードで開くため、同じホストの複数のワーカープロセスから同時に読み書きでき、
+    保存は1つのトランザクションで全体を置き換えるため、読み込む側は常にそろった内容を得ます。
+    """
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        # 他のプロセスが書き込み中の場合に待つ秒数
+        self.timeout = timeout
+        self.loads = 0
+        self.saves = 0
+        self.errors = 0
+        self.last_load_ms = 0.0
+        self.last_save_ms = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, docs_dir):
+        """
+        スナップショットから (FileInfoのリスト, 検証用シグネチャの辞書, パスからダイジェストへの辞書) を返します。
+        スナップショットがない場合や、別のディレクトリのものである場合はNoneです。
+        ダイジェストはシグネチャを検証するまで使えないため、FileInfoには設定しません。
+        保存されていた単語数と読書時間は統計情報のキャッシュに戻します（ダイジェストごとのため検証は不要です）。
+        """
+        if not os.path.exists(self.path):
+            return None
+        started = time.perf_counter()
+        try:
+            with self._lock, closing(self._connect()) as conn:
+                meta = dict(conn.execute('SELECT key, value FROM meta'))
+                if meta.get('docs_dir') != os.path.abspath(docs_dir):
+                    return None
+                rows = conn.execute(
+                    'SELECT path, name, size_bytes, mtime_ns, digest, cjk_chars, latin_words '
+                    'FROM files ORDER BY position'
+                ).fetchall()
+                signature = {
+                    path: (mtime_ns, int(ino), size)
+                    for path, mtime_ns, ino, size in conn.execute(
+                        'SELECT path, mtime_ns, ino, size FROM signatures')
+                }
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"Warning: Could not load catalog snapshot {self.path}: {e}")
+            return None
+
+        files = [
+            FileInfo(path=path, name=name, root=docs_dir, size_bytes=size_bytes, mtime_ns=mtime_ns,
+                     sort_key=make_sort_key(path))
+            for path, name, size_bytes, mtime_ns, _, _, _ in rows
+        ]
+        digests = {path: digest for path, _, _, _, digest, _, _ in rows if digest is not None}
+
+        # キャッシュの容量を超える分は戻さない（先頭のドキュメントを優先する）
+        for _, _, _, _, digest, cjk_chars, latin_words in reversed(rows[:STATS_CACHE_SIZE]):
+            if digest is not None and cjk_chars is not None:
+                store_text_stats(digest, TextStats(cjk_chars, latin_words))
+
+        self.loads += 1
+        self.last_load_ms = (time.perf_counter() - started) * 1000
+        return files, signature, digests
+
+    def save(self, docs_dir, files, signature):
+        """FileInfoのリストとシグネチャでスナップショットを置き換える"""
+        started = time.perf_counter()
+        rows = []
+        for position, file_info in enumerate(files):
+            digest = file_info.digest if file_info.digest_loaded else None
+            stats = cached_text_stats(digest) if digest is not None else None
+            rows.append((
+                position, file_info.path, file_info.name, _encode_sort_key(file_info.sort_key),
+                file_info.size_bytes, file_info.mtime_ns, digest,
+                stats.cjk_chars if stats else None, stats.latin_words if stats else None,
+                stats.word_count if stats else None, stats.reading_time if stats else None
+            ))
+        signature_rows = [(path, mtime_ns, str(ino), size) for path, (mtime_ns, ino, size) in signature.items()]
+
+        try:
+            with self._lock, closing(self._connect()) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.execute('DELETE FROM files')
+                    conn.execute('DELETE FROM signatures')
+                    conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                    conn.executemany('INSERT INTO signatures VALUES (?, ?, ?, ?)', signature_rows)
+                    conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+                        ('docs_dir', os.path.abspath(docs_dir)),
+                        ('saved_at', str(time.time()))
+                    ])
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"Warning: Could not save catalog snapshot {self.path}: {e}")
+            return False
+
+        self.saves += 1
+        self.last_save_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    def stats(self):
+        """スナップショットの利用状況を返す"""
+        return {
+            'path': self.path,
+            'loads': self.loads,
+            'saves': self.saves,
+            'errors': self.errors,
+            'last_load_ms': round(self.last_load_ms, 2),
+            'last_save_ms': round(self.last_save_ms, 2)
+        }
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # トランザクションは明示的に開始する
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                    for table in ('meta', 'files', 'signatures'):
+                        conn.execute(f'DROP TABLE IF EXISTS {table}')
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.execute('COMMIT')
+        except BaseException:
+            conn.close()
+            raise
+        return conn
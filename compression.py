@@ -0,0 +1,65 @@
+# compression.py - レスポンスの圧縮
+# ==================================
+
+import zlib
+
+# brotliがない環境ではgzipのみを使う
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 圧縮の対象とするMIMEタイプ
+COMPRESSIBLE_MIMETYPES = {
+    'text/html',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/x-ndjson'
+}
+
+def available_encodings():
+    """この環境で使えるエンコーディングを優先順に返す"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def negotiate_encoding(accept_encodings):
+    """Accept-Encodingから使うエンコーディングを選ぶ（圧縮しない場合はNone）"""
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding, level):
+    """本文を一括で圧縮する"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # wbits=31でgzip形式のヘッダーを付ける
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+class StreamCompressor:
+    """
+    ストリーミング用の圧縮器。
+    チャンクごとにフラッシュするため、受け取った分はすぐにクライアントで展開できます。
+    """
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def write(self, data):
+        """チャンクを圧縮して返す"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        """残りのデータを返して圧縮を終える"""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
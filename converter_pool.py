@@ -0,0 +1,68 @@
+# converter_pool.py - 再利用可能なMarkdownコンバーターのプール
+# ==============================================================
+
+import queue
+import threading
+from contextlib import contextmanager
+
+def reset_converter(md):
+    """
+    コンバーターを初期状態に戻す。
+    abbr拡張は定義した略語をinlinePatternsに直接登録し、md.reset()でも
+    消えないため、ここで取り除いて他のドキュメントへ漏れないようにします。
+    """
+    md.reset()
+    for name in [name for name in md.inlinePatterns._data if name.startswith('abbr-')]:
+        md.inlinePatterns.deregister(name)
+
+class ConverterPool:
+    """
+    構築済みのmarkdown.Markdownインスタンスを使い回すスレッドセーフなプール。
+    converter()で貸し出したインスタンスは返却されるまで他のスレッドに渡らず、
+    返却時にリセットされます。空きがなければ新しく構築します。
+    """
+    def __init__(self, factory, max_idle=8, reset=reset_converter):
+        self._factory = factory
+        self._reset = reset
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.checkouts = 0
+        self.discarded = 0
+
+    @contextmanager
+    def converter(self):
+        """コンバーターを1つ借り出す"""
+        try:
+            md = self._idle.get_nowait()
+        except queue.Empty:
+            md = self._factory()
+            with self._lock:
+                self.created += 1
+        with self._lock:
+            self.checkouts += 1
+
+        try:
+            yield md
+        except BaseException:
+            # 変換途中で失敗したインスタンスは状態が不明なので破棄する
+            with self._lock:
+                self.discarded += 1
+            raise
+
+        self._reset(md)
+        try:
+            self._idle.put_nowait(md)
+        except queue.Full:
+            with self._lock:
+                self.discarded += 1
+
+    def stats(self):
+        """プールの利用状況を返す"""
+        with self._lock:
+            return {
+                'created': self.created,
+                'checkouts': self.checkouts,
+                'discarded': self.discarded,
+                'idle': self._idle.qsize()
+            }
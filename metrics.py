@@ -0,0 +1,108 @@
+# metrics.py - リクエストの処理時間の計測とPrometheus形式の出力
+# ==============================================================
+
+import bisect
+import threading
+
+# ヒストグラムのバケットの上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """ラベルの組 ((名前, 値), ...) をPrometheusのテキスト形式に変換"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """固定バケットのヒストグラム（バケットごとの件数と合計を保持する）"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    ルートと処理段階ごとの所要時間のヒストグラムを保持する。
+    記録はバケットの位置を求めて数を足すだけなので、本番環境でも常時有効にできます。
+    ラベルの組はルート名と段階名だけで、値の種類は限られます。
+    """
+    def __init__(self, prefix='markdown_reader', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._requests = {}
+        self._phases = {}
+        self._responses = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, route, status, seconds, phases):
+        """1リクエストの所要時間と、段階ごとの所要時間（{段階: 秒}）を記録"""
+        with self._lock:
+            histogram = self._requests.get(route)
+            if histogram is None:
+                histogram = self._requests[route] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+            key = (route, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+            for phase, phase_seconds in phases.items():
+                histogram = self._phases.get((route, phase))
+                if histogram is None:
+                    histogram = self._phases[(route, phase)] = Histogram(self.buckets)
+                histogram.observe(phase_seconds)
+
+    def render(self, gauges=(), counters=()):
+        """
+        記録した値をPrometheusのテキスト形式で返します。
+        gauges/countersには (名前, 説明, [(ラベルの組, 値), ...]) を渡します。
+        """
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'request_duration_seconds', 'Request latency by route',
+                                    [((('route', route),), h) for route, h in sorted(self._requests.items())])
+            self._render_histograms(lines, 'phase_duration_seconds', 'Time spent in each phase by route',
+                                    [((('route', route), ('phase', phase)), h)
+                                     for (route, phase), h in sorted(self._phases.items())])
+            responses = [((('route', route), ('status', status)), count)
+                         for (route, status), count in sorted(self._responses.items())]
+        self._render_samples(lines, 'counter', 'responses_total', 'Responses by route and status', responses)
+
+        for name, description, samples in counters:
+            self._render_samples(lines, 'counter', name, description, samples)
+        for name, description, samples in gauges:
+            self._render_samples(lines, 'gauge', name, description, samples)
+        return '\n'.join(lines) + '\n'
+
+    def _render_samples(self, lines, kind, name, description, samples):
+        name = f'{self.prefix}_{name}'
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+
+    def _render_histograms(self, lines, name, description, histograms):
+        name = f'{self.prefix}_{name}'
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                bucket_labels = labels + (('le', bound if bound == '+Inf' else repr(bound)),)
+                lines.append(f'{name}_bucket{format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(histogram.total)}')
+            lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
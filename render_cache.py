@@ -0,0 +1,165 @@
+# render_cache.py - レンダリング済みHTMLのキャッシュ
+# ===================================================
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+def config_digest(*parts):
+    """Markdown拡張機能の設定からキャッシュキー用のダイジェストを生成"""
+    serialized = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+
+def content_digest(content):
+    """コンテンツのダイジェストを生成"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def file_digest(full_path, block_size=1024 * 1024):
+    """
+    ファイルの内容のダイジェストを一定サイズずつ読み込んで生成します。
+    UTF-8のファイルであればcontent_digestで読み込んだ本文から求めた値と同じです。
+    """
+    digest = hashlib.sha256()
+    with open(full_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def tree_digest(directory):
+    """ディレクトリ以下のファイルの内容からダイジェストを生成"""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            full_path = os.path.join(root, filename)
+            digest.update(os.path.relpath(full_path, directory).encode('utf-8'))
+            with open(full_path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class RenderCache:
+    """
+    変換済みHTMLのLRUキャッシュ。
+    エントリ数とバイト数の上限を超えると古いものから破棄します。
+    レスポンスの圧縮済みの本文（gzip/br）も同じ上限の中で保持します。
+    cache_dirを指定するとディスクにも保存し、再起動後も再利用します。
+    """
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024, cache_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, content, config_key):
+        """コンテンツと設定の組み合わせからキーを生成"""
+        return f'{config_key}-{content_digest(content)}'
+
+    def get(self, key):
+        """キャッシュ済みのHTMLを返す（なければNone）"""
+        return self._lookup(key, 'html')
+
+    def put(self, key, html):
+        """HTMLをキャッシュに保存"""
+        data = html.encode('utf-8')
+        with self._lock:
+            self._store(key, html, len(data))
+        self._write_disk(key, 'html', data)
+
+    def get_variant(self, key, encoding):
+        """圧縮済みの本文を返す（なければNone）"""
+        return self._lookup(key, encoding)
+
+    def put_variant(self, key, encoding, data):
+        """圧縮済みの本文をHTMLと同じくキャッシュに保存"""
+        with self._lock:
+            self._store((key, encoding), data, len(data))
+        self._write_disk(key, encoding, data)
+
+    def clear(self):
+        """メモリ上のエントリをすべて破棄"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """キャッシュの利用状況を返す"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
+
+    def _store(self, key, html, size):
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= previous[1]
+        self._entries[key] = (html, size)
+        self.current_bytes += size
+
+        # 上限を超えた分を古い順に破棄
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def _lookup(self, key, suffix):
+        entry_key = key if suffix == 'html' else (key, suffix)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[0]
+
+        data = self._read_disk(key, suffix)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            value = data.decode('utf-8') if suffix == 'html' else data
+            self._store(entry_key, value, len(data))
+        return value
+
+    def _disk_path(self, key, suffix):
+        return os.path.join(self.cache_dir, key[-2:], f'{key}.{suffix}')
+
+    def _read_disk(self, key, suffix):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key, suffix), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def _write_disk(self, key, suffix, data):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key, suffix)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルを読まれないよう、一時ファイルから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            print(f"Warning: Could not write render cache {path}: {e}")
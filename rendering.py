@@ -0,0 +1,59 @@
+# rendering.py - Markdownの変換設定と並列変換用のワーカー
+# ========================================================
+#
+# プロセスプールのワーカーがapp.pyを読み込まずに済むよう、
+# 変換に必要な設定と処理だけをこのモジュールにまとめています。
+
+import markdown
+
+from converter_pool import ConverterPool
+from text_stats import get_text_stats
+
+# Markdown拡張機能を設定
+MARKDOWN_EXTENSIONS = [
+    'markdown.extensions.tables',
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.toc',
+    'markdown.extensions.attr_list',
+    'markdown.extensions.def_list',
+    'markdown.extensions.abbr',
+    'markdown.extensions.footnotes',
+    'markdown.extensions.md_in_html'
+]
+
+MARKDOWN_EXTENSION_CONFIGS = {
+    'markdown.extensions.codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': True
+    },
+    'markdown.extensions.toc': {
+        'permalink': True,
+        'permalink_class': 'toc-link',
+        'permalink_title': 'Permalink to this heading'
+    }
+}
+
+def create_markdown_converter():
+    """拡張機能を登録済みのMarkdownコンバーターを作成"""
+    return markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS,
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    )
+
+# ワーカープロセス内で使うコンバーターのプール
+_worker_pool = None
+
+def init_worker():
+    """ワーカープロセスの初期化（プロセスごとにコンバーターのプールを用意）"""
+    global _worker_pool
+    _worker_pool = ConverterPool(create_markdown_converter, max_idle=1)
+
+def render_document(content):
+    """ワーカープロセスでMarkdownを変換し、(HTML, 単語数, 読書時間) を返す"""
+    if _worker_pool is None:
+        init_worker()
+    with _worker_pool.converter() as md:
+        html_content = md.convert(content)
+    stats = get_text_stats(content)
+    return html_content, stats.word_count, stats.reading_time
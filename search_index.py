@@ -0,0 +1,314 @@
+# search_index.py - 全文検索用の転置インデックス
+# ===============================================
+
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+
+from text_stats import CJK_RANGES
+
+# 小文字化したテキストから英数字の単語とCJK文字の連続を取り出す
+TOKEN_PATTERN = re.compile(f'[a-z0-9]+|[{CJK_RANGES}]+')
+CJK_RUN_PATTERN = re.compile(f'[{CJK_RANGES}]')
+
+# ファイル名一致の加点
+FILENAME_BOOST = 100.0
+
+def cjk_tokens(run):
+    """CJK文字の連続を1文字と2文字（バイグラム）のトークンに分割"""
+    tokens = list(run)
+    tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def tokenize(text):
+    """インデックス用にテキストをトークン化し、出現回数を返す"""
+    counts = Counter()
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group(0)
+        if CJK_RUN_PATTERN.match(token):
+            counts.update(cjk_tokens(token))
+        else:
+            counts[token] += 1
+    return counts
+
+def iter_lines(content):
+    """content.split('\\n')と同じ行を、リストを作らずに順に返す"""
+    start = 0
+    while True:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+def query_terms(query):
+    """
+    小文字化したクエリから検索条件 (トークン, 一致方法) を取り出す。
+    クエリの両端に接するトークンは前後が途切れている可能性があるため、
+    インデックス側の単語との部分一致（prefix/suffix/contains）で探します。
+    CJK文字はバイグラム（1文字なら単体）で完全一致させます。
+    """
+    terms = []
+    for match in TOKEN_PATTERN.finditer(query):
+        token = match.group(0)
+        if CJK_RUN_PATTERN.match(token):
+            if len(token) == 1:
+                terms.append((token, 'exact'))
+            else:
+                terms.extend((token[i:i + 2], 'exact') for i in range(len(token) - 1))
+            continue
+
+        open_left = match.start() == 0
+        open_right = match.end() == len(query)
+        if open_left and open_right:
+            mode = 'contains'
+        elif open_left:
+            mode = 'suffix'
+        elif open_right:
+            mode = 'prefix'
+        else:
+            mode = 'exact'
+        terms.append((token, mode))
+    return list(dict.fromkeys(terms))
+
+class IndexedDocument:
+    """インデックス済みドキュメントの情報"""
+    def __init__(self, file_info, signature, terms):
+        self.file_info = file_info
+        self.signature = signature
+        self.terms = terms
+        self.position = 0
+
+class SearchIndex:
+    """
+    カタログから構築するメモリ上の転置インデックス。
+    ポスティングは単語ごとに [doc_id, 出現回数, ...] を並べたarrayで保持し、
+    sync()で変更のあったファイルだけを差し替えます。
+    候補ドキュメントは本文を行ごとに再確認してから結果に含めます。
+    max_document_bytesを指定すると、それより大きなファイルは先頭の部分だけを
+    インデックスと検索の対象にし、on_truncate(FileInfo)で通知します。
+    """
+    def __init__(self, max_expansion=256, max_document_bytes=None, on_truncate=None):
+        # 部分一致で展開する単語数の上限（超える条件は絞り込みに使わない）
+        self.max_expansion = max_expansion
+        self.max_document_bytes = max_document_bytes
+        self.on_truncate = on_truncate
+        self.truncated = 0
+        # 同期したカタログのバージョン（表示用）と一覧
+        self.synced_version = None
+        self._synced_files = None
+        self.updates = 0
+        self.removals = 0
+        self.queries = 0
+        self.scans = 0
+        self._postings = {}
+        self._doc_ids = {}
+        self._docs = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def sync(self, files, version):
+        """
+        カタログの内容とインデックスを同期（変更のあったファイルのみ再インデックス）
+        同期済みかどうかはバージョンではなく一覧の同一性で判定します。一覧とバージョンは
+        別々に読み出されるため、間にカタログが更新されると組み合わせが食い違うことがあります。
+        """
+        with self._lock:
+            if files is self._synced_files:
+                return
+
+            current = {file_info.path: file_info for file_info in files}
+            for path in [path for path in self._doc_ids if path not in current]:
+                self._remove(path)
+
+            for position, file_info in enumerate(files):
+                signature = (file_info.mtime_ns, file_info.size_bytes)
+                doc_id = self._doc_ids.get(file_info.path)
+                if doc_id is not None:
+                    document = self._docs[doc_id]
+                    if document.signature == signature:
+                        document.file_info = file_info
+                        document.position = position
+                        continue
+                    self._remove(file_info.path)
+                self._add(file_info, signature).position = position
+
+            self.synced_version = version
+            self._synced_files = files
+
+    def search(self, query, files):
+        """
+        クエリに一致する結果を関連度順に返すジェネレーター。
+        各要素は (種類, FileInfo, 行番号, 行) のタプルで、種類は
+        'filename' または 'content' です。本文の確認は結果を取り出す
+        たびに行うため、必要な件数だけ取り出せば残りは読み込みません。
+        """
+        lowered = query.lower()
+        with self._lock:
+            self.queries += 1
+            scores = self._score(query_terms(lowered))
+
+        if scores is None:
+            # 絞り込みに使える条件がない場合は全ドキュメントを走査
+            with self._lock:
+                self.scans += 1
+            yield from self._scan(lowered, files)
+            return
+
+        with self._lock:
+            candidates = {}
+            for doc_id, score in scores.items():
+                document = self._docs[doc_id]
+                candidates[document.file_info.path] = [score, document.position, document.file_info, True]
+
+        for position, file_info in enumerate(files):
+            if lowered in file_info.name.lower():
+                candidate = candidates.setdefault(file_info.path, [0.0, position, file_info, False])
+                candidate[0] += FILENAME_BOOST
+
+        for score, position, file_info, content_match in sorted(
+                candidates.values(), key=lambda c: (-c[0], c[1])):
+            if lowered in file_info.name.lower():
+                yield ('filename', file_info, None, None)
+            if content_match:
+                yield from self._matching_lines(lowered, file_info)
+
+    def stats(self):
+        """インデックスの状態を返す"""
+        with self._lock:
+            return {
+                'documents': len(self._docs),
+                'terms': len(self._postings),
+                'postings': sum(len(p) for p in self._postings.values()) // 2,
+                'updates': self.updates,
+                'removals': self.removals,
+                'queries': self.queries,
+                'scans': self.scans,
+                'truncated': self.truncated,
+                'version': self.synced_version
+            }
+
+    def export(self):
+        """
+        インデックスをJSONに変換できる形式で返す。
+        documentsはカタログ順のパスで、postingsの値は [ドキュメントの位置, 出現回数, ...] です。
+        """
+        with self._lock:
+            order = sorted(self._docs.items(), key=lambda item: item[1].position)
+            positions = {doc_id: i for i, (doc_id, _) in enumerate(order)}
+            postings = {}
+            for term in sorted(self._postings):
+                posting = self._postings[term]
+                exported = []
+                for i in range(0, len(posting), 2):
+                    exported.extend((positions[posting[i]], posting[i + 1]))
+                postings[term] = exported
+            return {
+                'documents': [document.file_info.path for _, document in order],
+                'postings': postings
+            }
+
+    def _scan(self, lowered, files):
+        for file_info in files:
+            if lowered in file_info.name.lower():
+                yield ('filename', file_info, None, None)
+            yield from self._matching_lines(lowered, file_info)
+
+    def _read(self, file_info):
+        """インデックスの対象とする本文（大きなファイルは先頭の部分）を返す"""
+        if self.max_document_bytes is not None and file_info.size_bytes > self.max_document_bytes:
+            return file_info.read_chunk(0, self.max_document_bytes)[0]
+        return file_info.read_content()
+
+    def _matching_lines(self, lowered, file_info):
+        try:
+            content = self._read(file_info)
+        except (IOError, OSError, ValueError):
+            return
+        for line_num, line in enumerate(iter_lines(content), 1):
+            if lowered in line.lower():
+                yield ('content', file_info, line_num, line)
+
+    def _expand(self, token, mode):
+        """一致方法に応じて該当する単語を列挙（多すぎる場合はNone）"""
+        if mode == 'exact':
+            return [token] if token in self._postings else []
+        if mode == 'prefix':
+            matched = [term for term in self._postings if term.startswith(token)]
+        elif mode == 'suffix':
+            matched = [term for term in self._postings if term.endswith(token)]
+        else:
+            matched = [term for term in self._postings if token in term]
+        return matched if len(matched) <= self.max_expansion else None
+
+    def _score(self, terms):
+        """条件をすべて満たすドキュメントのスコア（TF-IDF）を計算"""
+        scores = None
+        total = max(len(self._docs), 1)
+        for token, mode in terms:
+            expanded = self._expand(token, mode)
+            if expanded is None:
+                continue
+
+            frequencies = Counter()
+            for term in expanded:
+                posting = self._postings[term]
+                for i in range(0, len(posting), 2):
+                    frequencies[posting[i]] += posting[i + 1]
+
+            idf = math.log(1 + total / max(len(frequencies), 1))
+            if scores is None:
+                scores = {doc_id: tf * idf for doc_id, tf in frequencies.items()}
+            else:
+                scores = {
+                    doc_id: score + frequencies[doc_id] * idf
+                    for doc_id, score in scores.items()
+                    if doc_id in frequencies
+                }
+            if not scores:
+                break
+        return scores
+
+    def _add(self, file_info, signature):
+        try:
+            counts = tokenize(self._read(file_info))
+        except (IOError, OSError, ValueError) as e:
+            print(f"Warning: Could not index file {file_info.path}: {e}")
+            counts = Counter()
+
+        doc_id = self._next_id
+        self._next_id += 1
+        for term, count in counts.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = array('I')
+            posting.extend((doc_id, min(count, 0xFFFFFFFF)))
+
+        if self.max_document_bytes is not None and file_info.size_bytes > self.max_document_bytes:
+            self.truncated += 1
+            if self.on_truncate is not None:
+                self.on_truncate(file_info)
+
+        document = IndexedDocument(file_info, signature, tuple(counts))
+        self._doc_ids[file_info.path] = doc_id
+        self._docs[doc_id] = document
+        self.updates += 1
+        return document
+
+    def _remove(self, path):
+        doc_id = self._doc_ids.pop(path)
+        document = self._docs.pop(doc_id)
+        for term in document.terms:
+            posting = self._postings[term]
+            kept = array('I')
+            for i in range(0, len(posting), 2):
+                if posting[i] != doc_id:
+                    kept.extend((posting[i], posting[i + 1]))
+            if kept:
+                self._postings[term] = kept
+            else:
+                del self._postings[term]
+        self.removals += 1
@@ -0,0 +1,218 @@
+# sections.py - 見出しの索引とセクション単位の切り出し
+# ====================================================
+
+import re
+import threading
+from collections import OrderedDict
+
+from markdown.extensions.toc import slugify, unique
+
+from text_stats import FENCE_PATTERN
+
+# Python-Markdownの見出し行（ATX形式、#の後の空白は省略できる）
+ATX_HEADING_PATTERN = re.compile(r'^(#{1,6})(.*?)#*[ \t]*$')
+# 下線形式の見出しの下線
+SETEXT_PATTERN = re.compile(r'^[ ]{0,3}(=+|-+)[ \t]*$')
+# インデントされたコードの行（下線形式の見出しにならない）
+INDENTED_PATTERN = re.compile(r'^([ ]{4}|\t)')
+# 参照形式のリンクと略語の定義（セクション単体でも解決できるよう、切り出した本文に加える）
+DEFINITION_PATTERN = re.compile(r'^[ ]{0,3}(\[(?!\^)[^\]]+\]|\*\[[^\]]+\]):')
+# 見出しの末尾のattr_list
+ATTR_LIST_PATTERN = re.compile(r'\{:?[^}]*\}$')
+
+# 見出しの索引をキャッシュするドキュメント数
+OUTLINE_CACHE_SIZE = 1024
+
+class Heading:
+    """
+    見出し1つ分の索引。
+    行番号は1から数え、end_lineとsection_end_lineは範囲の次の行です。
+    start/end/section_endはUTF-8でのバイト位置で、endは次の見出しまで、
+    section_endは同じか上のレベルの次の見出しまで（小見出しを含む）の終わりです。
+    """
+    __slots__ = ('level', 'title', 'slug', 'line', 'end_line', 'section_end_line', 'start', 'end', 'section_end')
+
+    def __init__(self, level, title, slug, line, start):
+        self.level = level
+        self.title = title
+        self.slug = slug
+        self.line = line
+        self.end_line = self.section_end_line = line
+        self.start = start
+        self.end = self.section_end = start
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class Outline:
+    """ドキュメントの見出しの索引"""
+    __slots__ = ('headings', 'definitions', 'size_bytes', '_by_slug')
+
+    def __init__(self, headings, definitions, size_bytes):
+        self.headings = headings
+        # 参照形式のリンクと略語の定義の行
+        self.definitions = definitions
+        self.size_bytes = size_bytes
+        self._by_slug = {heading.slug: heading for heading in headings}
+
+    def find(self, slug):
+        """slugの見出しを返す（なければNone）"""
+        return self._by_slug.get(slug)
+
+    def headings_between(self, start, end):
+        """start以上end未満のバイト位置から始まる見出し"""
+        return [heading for heading in self.headings if start <= heading.start < end]
+
+    def to_list(self):
+        return [heading.to_dict() for heading in self.headings]
+
+def scan_headings(lines):
+    """
+    UTF-8のバイト列の行（改行付き）を順に読み、見出しの一覧と参照の定義を返します。
+    見出しは (レベル, 見出し行のリスト, 行番号, バイト位置) で、
+    コードブロック内の行は見出しとして扱いません。
+    引用・リスト・HTMLブロックの中の見出しは対象外です（ページの目次には含まれます）。
+    """
+    headings = []
+    definitions = []
+    fence = None
+    offset = 0
+    # 下線形式の見出しの本文になりうる直前の行 (行, 行番号, バイト位置)
+    candidate = None
+    # 直前の行でブロックが区切られたか（空行・コードブロック・見出しの後）
+    block_start = True
+    line_num = 0
+
+    for line_num, raw in enumerate(lines, 1):
+        line = raw.decode('utf-8').rstrip('\r\n')
+        blank = not line.strip()
+        match = FENCE_PATTERN.match(line)
+        if match:
+            marker = match.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            candidate = None
+            block_start = True
+        elif fence is None:
+            heading = ATX_HEADING_PATTERN.match(line)
+            if heading:
+                headings.append((len(heading.group(1)), [line], line_num, offset))
+                candidate = None
+                block_start = True
+            elif candidate is not None and SETEXT_PATTERN.match(line):
+                title, title_line, title_start = candidate
+                headings.append((1 if line.lstrip()[0] == '=' else 2, [title, line], title_line, title_start))
+                candidate = None
+                block_start = True
+            else:
+                if DEFINITION_PATTERN.match(line):
+                    definitions.append(line)
+                # ブロックの最初の行だけを見出しの候補にする
+                if block_start and not blank and not INDENTED_PATTERN.match(line):
+                    candidate = (line, line_num, offset)
+                else:
+                    candidate = None
+                block_start = blank
+        offset += len(raw)
+    return headings, definitions, line_num, offset
+
+def heading_slugs(md, headings, definitions):
+    """
+    tocの拡張機能と同じ規則でidを求め、(id, 見出しのテキスト) のリストを返します。
+    見出し行だけを変換するため、本文全体を変換するより軽く、
+    重複した見出しの番号付け（_1, _2, ...）やattr_listによる指定もページと一致します。
+    """
+    source = '\n\n'.join('\n'.join(lines) for _, lines, _, _ in headings)
+    if definitions:
+        source += '\n\n' + '\n'.join(definitions)
+    md.convert(source)
+
+    tokens = []
+    pending = list(reversed(md.toc_tokens))
+    while pending:
+        token = pending.pop()
+        tokens.append((token['id'], token['name']))
+        pending.extend(reversed(token['children']))
+
+    if len(tokens) == len(headings):
+        return tokens
+    # 見出しとして変換されなかった行がある場合は、見出しのテキストから求める
+    used_ids = set()
+    result = []
+    for _, lines, _, _ in headings:
+        title = ATX_HEADING_PATTERN.match(lines[0]).group(2).strip() if len(lines) == 1 else lines[0].strip()
+        result.append((unique(slugify(title, '-'), used_ids), title))
+    return result
+
+def build_outline(lines, md):
+    """
+    UTF-8のバイト列の行から見出しの索引を作成します。
+    mdにはidの計算に使うMarkdownコンバーターを渡します（ページの変換と同じ設定のもの）。
+    """
+    headings, definitions, line_count, size_bytes = scan_headings(lines)
+    slugs = heading_slugs(md, headings, definitions) if headings else []
+
+    result = [Heading(level, title, slug, line_num, start)
+              for (level, _, line_num, start), (slug, title) in zip(headings, slugs)]
+    for i, heading in enumerate(result):
+        following = result[i + 1] if i + 1 < len(result) else None
+        heading.end = following.start if following else size_bytes
+        heading.end_line = following.line if following else line_count + 1
+        parent_end = next((other for other in result[i + 1:] if other.level <= heading.level), None)
+        heading.section_end = parent_end.start if parent_end else size_bytes
+        heading.section_end_line = parent_end.line if parent_end else line_count + 1
+    return Outline(result, definitions, size_bytes)
+
+def with_heading_id(line, slug):
+    """見出し行にattr_listでidを付ける（すでにidを指定している場合はそのまま）"""
+    attrs = ATTR_LIST_PATTERN.search(line)
+    if attrs is None:
+        return f'{line} {{#{slug}}}'
+    if '#' in attrs.group():
+        return line
+    return f'{line[:-1]} #{slug}}}'
+
+def section_source(outline, text, first_line, headings):
+    """
+    切り出した本文をセクション単体で変換できるMarkdownにします。
+    textはfirst_line行目から始まる本文で、headingsはその中の見出しです。
+    見出しにはページと同じidを付け、参照形式のリンクと略語の定義を末尾に加えます。
+    """
+    lines = text.split('\n')
+    for heading in headings:
+        index = heading.line - first_line
+        if not 0 <= index < len(lines):
+            continue
+        match = ATX_HEADING_PATTERN.match(lines[index].rstrip('\r'))
+        if match:
+            lines[index] = with_heading_id(f'{match.group(1)} {match.group(2).strip()}', heading.slug)
+        else:
+            lines[index] = with_heading_id(lines[index].rstrip(), heading.slug)
+    source = '\n'.join(lines)
+    if outline.definitions:
+        source += '\n\n' + '\n'.join(outline.definitions) + '\n'
+    return source
+
+# 内容のハッシュごとの見出しの索引
+_outline_cache = OrderedDict()
+_outline_cache_lock = threading.Lock()
+
+def get_outline(digest, build):
+    """
+    見出しの索引を返す（同じ内容の2回目以降はキャッシュから返す）。
+    キャッシュにない場合はbuild()で作成します。
+    """
+    with _outline_cache_lock:
+        outline = _outline_cache.get(digest)
+        if outline is not None:
+            _outline_cache.move_to_end(digest)
+            return outline
+
+    outline = build()
+    with _outline_cache_lock:
+        _outline_cache[digest] = outline
+        while len(_outline_cache) > OUTLINE_CACHE_SIZE:
+            _outline_cache.popitem(last=False)
+    return outline
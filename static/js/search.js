@@ -10,6 +10,9 @@ class SearchManager {
     this.highlightedIndex = -1;
     this.debounceTimer = null;
     this.debounceDelay = 300;
+    this.serverSearchUrl = null;
+    this.serverResultLimit = 10;
+    this.serverSearchController = null;
     
     this.init();
   }
@@ -24,6 +27,9 @@ class SearchManager {
     // Find all search inputs
     this.searchInputs = document.querySelectorAll('input[type="search"], .content-search, .sidebar-search input');
     
+    // The server renders the API URL (with any SCRIPT_NAME prefix); static exports omit it
+    this.serverSearchUrl = document.querySelector('[data-search-url]')?.dataset.searchUrl || null;
+    
     // Create or find search results containers
     this.searchInputs.forEach(input => {
       this.setupSearchContainer(input);
@@ -156,9 +162,90 @@ class SearchManager {
       
       const results = this.performSearch(query);
       this.displayResults(input, results);
+      this.fetchServerResults(input, query, results);
     }, this.debounceDelay);
   }
   
+  async fetchServerResults(input, query, localResults) {
+    if (!this.serverSearchUrl) return;
+    
+    // Cancel the previous query's stream
+    if (this.serverSearchController) {
+      this.serverSearchController.abort();
+    }
+    const controller = new AbortController();
+    this.serverSearchController = controller;
+    
+    const params = new URLSearchParams({
+      q: query,
+      limit: this.serverResultLimit,
+      format: 'ndjson'
+    });
+    const combined = [...localResults];
+    // Skip server hits for pages already listed (file name matches duplicate the sidebar results)
+    const seen = new Set(localResults.map(result => result.href));
+    
+    try {
+      const response = await fetch(`${this.serverSearchUrl}?${params}`, {
+        signal: controller.signal
+      });
+      if (!response.ok || !response.body) return;
+      
+      // Render hits as each NDJSON line arrives
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        
+        const hits = lines
+          .filter(line => line.trim())
+          .map(line => JSON.parse(line))
+          .filter(item => item.type && !seen.has(item.url));
+        
+        if (hits.length === 0 || query !== this.currentQuery) continue;
+        
+        hits.forEach(item => seen.add(item.url));
+        combined.push(...hits.map(item => this.fromServerResult(item, query)));
+        this.displayResults(input, combined);
+      }
+    } catch (e) {
+      if (e.name !== 'AbortError') {
+        console.warn('Server search failed:', e);
+      }
+    } finally {
+      if (this.serverSearchController === controller) {
+        this.serverSearchController = null;
+      }
+    }
+  }
+  
+  fromServerResult(item, query) {
+    const title = this.escapeHtml(item.file_name);
+    const context = item.type === 'content'
+      ? `${this.escapeHtml(item.match)} (line ${item.line_number})`
+      : this.escapeHtml(item.file_path);
+    
+    return {
+      type: 'server',
+      title: title,
+      href: item.url,
+      highlightText: this.highlightMatch(context, this.escapeHtml(query))
+    };
+  }
+  
+  escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+  }
+  
   performSearch(query) {
     const lowercaseQuery = query.toLowerCase();
     const results = [];
@@ -0,0 +1,105 @@
+// Lazy Section Loading Module
+// ===========================
+
+class LazySectionLoader {
+  constructor() {
+    this.sections = [];
+    this.observer = null;
+    // Start loading a section this far before it scrolls into view
+    this.rootMargin = '1500px 0px';
+
+    this.init();
+  }
+
+  init() {
+    this.container = document.querySelector('.lazy-sections[data-section-base]');
+    if (!this.container) return;
+    this.sections = Array.from(this.container.querySelectorAll('.lazy-section[data-section]'));
+
+    if ('IntersectionObserver' in window) {
+      this.observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+          if (entry.isIntersecting) {
+            this.load(entry.target);
+          }
+        });
+      }, { rootMargin: this.rootMargin });
+      this.sections.forEach(section => this.observer.observe(section));
+    } else {
+      this.loadAll();
+    }
+
+    // Permalinks point at headings that may not be loaded yet
+    window.addEventListener('hashchange', () => this.loadTarget());
+    this.loadTarget();
+  }
+
+  async loadTarget() {
+    const id = decodeURIComponent(window.location.hash.slice(1));
+    const target = id && document.getElementById(id);
+    const section = target && target.closest('.lazy-section');
+    if (!section) return;
+
+    await this.load(section);
+    document.getElementById(id)?.scrollIntoView();
+  }
+
+  sectionUrl(section) {
+    // Load only the text up to the next heading; subsections have their own placeholders
+    return `${this.container.dataset.sectionBase}${encodeURIComponent(section.dataset.section)}?nested=0`;
+  }
+
+  load(section) {
+    if (!section.dataset.section) {
+      return section.loading || Promise.resolve();
+    }
+
+    const url = this.sectionUrl(section);
+    delete section.dataset.section;
+    this.observer?.unobserve(section);
+    section.classList.add('is-loading');
+
+    section.loading = fetch(url, { headers: { 'Accept': 'application/json' } })
+      .then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+      })
+      .then(data => this.replace(section, data.html))
+      .catch(error => {
+        console.warn('Failed to load section:', error);
+        section.classList.add('is-error');
+      })
+      .finally(() => section.classList.remove('is-loading'));
+    return section.loading;
+  }
+
+  replace(section, html) {
+    // Keep the reader's position when a section above the viewport grows
+    const above = section.getBoundingClientRect().bottom <= 0;
+    const previousHeight = section.offsetHeight;
+
+    section.innerHTML = html;
+    section.classList.add('is-loaded');
+
+    if (above) {
+      window.scrollBy(0, section.offsetHeight - previousHeight);
+    }
+    document.dispatchEvent(new CustomEvent('sectionloaded', { detail: { section } }));
+  }
+
+  loadAll() {
+    return Promise.all(this.sections.map(section => this.load(section)));
+  }
+}
+
+// Export for use in other modules
+window.LazySectionLoader = LazySectionLoader;
+
+// Auto-initialize if DOM is ready
+if (document.readyState === 'loading') {
+  document.addEventListener('DOMContentLoaded', () => {
+    window.lazySectionLoader = new LazySectionLoader();
+  });
+} else {
+  window.lazySectionLoader = new LazySectionLoader();
+}
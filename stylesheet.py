@@ -0,0 +1,147 @@
+# stylesheet.py - SCSSのコンパイルとキャッシュ
+# ============================================
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+# libsassがない環境ではフォールバックのCSSを返す
+try:
+    import sass
+except ImportError:
+    sass = None
+
+# Fallback: serve a basic CSS file if sass is not installed
+FALLBACK_CSS = """
+        /* Basic fallback styles */
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; }
+        .app-container { display: flex; min-height: 100vh; }
+        .sidebar { width: 300px; background: #f8f9fa; padding: 1rem; }
+        .main-content { flex: 1; padding: 1rem; }
+        .markdown-content { max-width: 800px; margin: 0 auto; }
+        """
+
+class CompiledStylesheet:
+    """コンパイル済みのCSSとそのダイジェスト"""
+    def __init__(self, css, mtime_ns):
+        self.css = css
+        self.digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        # 最も新しい.scssファイルの更新時刻
+        self.mtime_ns = mtime_ns
+
+class StylesheetCompiler:
+    """
+    SCSSをコンパイルした結果を保持する。
+    パーシャルを含むすべての.scssファイルのstat情報が変わったときだけ再コンパイルします。
+    cache_dirを指定すると、.scssファイルの内容のハッシュをキーにディスクにも保存し、
+    再起動後もコンパイルせずに再利用します。
+    """
+    def __init__(self, scss_dir, entry='main.scss', cache_dir=None, revalidate_interval=1.0):
+        self.scss_dir = scss_dir
+        self.entry = entry
+        self.cache_dir = cache_dir
+        # この秒数以内の再検証はstatも行わずキャッシュを返す
+        self.revalidate_interval = revalidate_interval
+        self.compiles = 0
+        self.disk_hits = 0
+        self.errors = 0
+        self._compiled = None
+        self._key = None
+        self._validated_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, output_style='compressed'):
+        """最新のCompiledStylesheetを返す（変更がなければ前回の結果）"""
+        with self._lock:
+            now = time.monotonic()
+            if (self._compiled is not None and self._key[0] == output_style
+                    and now - self._validated_at < self.revalidate_interval):
+                return self._compiled
+
+            sources = self._sources()
+            key = (output_style, tuple((path, st.st_mtime_ns, st.st_size) for path, st in sources))
+            if self._compiled is None or key != self._key:
+                mtime_ns = max((st.st_mtime_ns for _, st in sources), default=0)
+                self._compiled = CompiledStylesheet(self._build(output_style, sources), mtime_ns)
+                self._key = key
+            self._validated_at = now
+            return self._compiled
+
+    def stats(self):
+        """コンパイルの状況を返す"""
+        with self._lock:
+            return {
+                'compiles': self.compiles,
+                'disk_hits': self.disk_hits,
+                'errors': self.errors,
+                'digest': self._compiled.digest if self._compiled is not None else None
+            }
+
+    def _sources(self):
+        """.scssファイルのパスとstat情報を名前順に返す"""
+        sources = []
+        try:
+            with os.scandir(self.scss_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.scss') and entry.is_file():
+                        sources.append((entry.path, entry.stat()))
+        except OSError as e:
+            print(f"Warning: Could not list {self.scss_dir}: {e}")
+        return sorted(sources)
+
+    def _build(self, output_style, sources):
+        if sass is None:
+            return FALLBACK_CSS
+
+        digest = hashlib.sha256(f'{sass.__version__}:{output_style}'.encode('utf-8'))
+        try:
+            for path, _ in sources:
+                digest.update(os.path.basename(path).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        except (IOError, OSError):
+            digest = None
+        cache_path = self._cache_path(digest.hexdigest()) if digest is not None else None
+
+        if cache_path is not None:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    css = f.read()
+                self.disk_hits += 1
+                return css
+            except (IOError, OSError):
+                pass
+
+        try:
+            css = sass.compile(
+                filename=os.path.join(self.scss_dir, self.entry),
+                output_style=output_style,
+                include_paths=[self.scss_dir]
+            )
+        except Exception as e:
+            # エラーは.scssファイルが変わるまで保持する（ディスクには保存しない）
+            self.errors += 1
+            return f"/* SCSS compilation error: {str(e)} */"
+        self.compiles += 1
+
+        if cache_path is not None:
+            self._write_cache(cache_path, css)
+        return css
+
+    def _cache_path(self, digest):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f'{os.path.splitext(self.entry)[0]}-{digest}.css')
+
+    def _write_cache(self, path, css):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルを読まれないよう、一時ファイルから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(css)
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            print(f"Warning: Could not write stylesheet cache {path}: {e}")
@@ -0,0 +1,92 @@
+# text_stats.py - テキストの統計情報
+# ==================================
+
+import re
+import threading
+from collections import OrderedDict
+
+from render_cache import content_digest
+
+READING_SPEED_CJK = 400  # 日本語読書速度（文字/分）
+READING_SPEED_LATIN = 200  # 英語読書速度（語/分）
+
+# CJK文字（中国語、日本語、韓国語）のUnicode範囲
+CJK_RANGES = '\u4e00-\u9fff\u3400-\u4dbf\u3040-\u309f\u30a0-\u30ff'
+
+# CJK文字の連続（グループ1）と英単語を1回の走査で取り出す
+# 2つの文字種は重ならないため、別々に数えた場合と結果は同じです
+STATS_PATTERN = re.compile(f'([{CJK_RANGES}]+)|\\b[a-zA-Z]+\\b')
+
+# コードブロックの開始・終了行
+FENCE_PATTERN = re.compile(r'^[ \t]{0,3}(`{3,}|~{3,})')
+
+# 統計情報をキャッシュするドキュメント数
+STATS_CACHE_SIZE = 4096
+
+class TextStats:
+    """CJK文字数と英単語数から求めた統計情報"""
+    def __init__(self, cjk_chars, latin_words):
+        self.cjk_chars = cjk_chars
+        self.latin_words = latin_words
+
+    @property
+    def word_count(self):
+        """単語数（CJK文字は1文字を1語として計算）"""
+        return self.cjk_chars + self.latin_words
+
+    @property
+    def reading_time(self):
+        """推定読書時間（分）"""
+        total_time = self.cjk_chars / READING_SPEED_CJK + self.latin_words / READING_SPEED_LATIN
+        return max(1, round(total_time))
+
+def analyze_text(content):
+    """1回の走査でCJK文字数と英単語数を数える（一致した文字列のリストは作らない）"""
+    cjk_chars = 0
+    latin_words = 0
+    for match in STATS_PATTERN.finditer(content):
+        if match.lastindex:
+            cjk_chars += match.end() - match.start()
+        else:
+            latin_words += 1
+    return TextStats(cjk_chars, latin_words)
+
+# 内容のハッシュごとの統計情報
+_stats_cache = OrderedDict()
+_stats_cache_lock = threading.Lock()
+
+def cached_text_stats(digest):
+    """キャッシュ済みの統計情報を返す（なければNone、計算はしない）"""
+    with _stats_cache_lock:
+        stats = _stats_cache.get(digest)
+        if stats is not None:
+            _stats_cache.move_to_end(digest)
+        return stats
+
+def store_text_stats(digest, stats):
+    """計算済みの統計情報をキャッシュに保存"""
+    with _stats_cache_lock:
+        _stats_cache[digest] = stats
+        while len(_stats_cache) > STATS_CACHE_SIZE:
+            _stats_cache.popitem(last=False)
+
+def get_text_stats(content, digest=None):
+    """
+    統計情報を返す（同じ内容の2回目以降はキャッシュから返す）。
+    ハッシュを計算済みの場合はdigestに渡します。
+    """
+    if digest is None:
+        digest = content_digest(content)
+    stats = cached_text_stats(digest)
+    if stats is None:
+        stats = analyze_text(content)
+        store_text_stats(digest, stats)
+    return stats
+
+def calculate_reading_time(content):
+    """コンテンツの推定読書時間を計算"""
+    return get_text_stats(content).reading_time
+
+def count_words(content):
+    """コンテンツの単語数をカウント"""
+    return get_text_stats(content).word_count
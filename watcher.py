@@ -0,0 +1,228 @@
+# watcher.py - ドキュメントディレクトリの監視
+# ============================================
+
+import os
+import threading
+import time
+
+from catalog import EXCLUDED_DIRS
+
+# watchdog（inotify等）が使えない環境ではポーリングで監視する
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+class _EventHandler:
+    """watchdogのイベントをDocsWatcherに転送する"""
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def dispatch(self, event):
+        if event.is_directory:
+            # ディレクトリ自体の更新は中のファイルの変更で発生するので無視する
+            if event.event_type != 'modified':
+                self.watcher.notify(None)
+            return
+        self.watcher.notify(event.src_path)
+        if event.event_type == 'moved':
+            self.watcher.notify(event.dest_path)
+
+class DocsWatcher:
+    """
+    ドキュメントディレクトリを監視し、変更をカタログへ反映するバックグラウンドスレッド。
+    イベントはdebounce秒間途切れるまでまとめてから1回だけ反映するため、
+    git checkoutなどで大量のファイルが変わっても再構築は1回で済みます。
+    watchdogがない場合はpoll_interval秒ごとにstat情報を比較します。
+    スレッドはフォークした子プロセスに引き継がれないため、子プロセスでは状態を初期化し、
+    ensure_started()で改めて開始します。
+    """
+    def __init__(self, catalog, debounce=0.5, max_delay=5.0, poll_interval=2.0,
+                 batch_limit=500, on_change=None):
+        self.catalog = catalog
+        self.debounce = debounce
+        # イベントが続いてもこの秒数を超えたら反映する
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        # これ以上のファイルが変わった場合は個別に反映せず再構築する
+        self.batch_limit = batch_limit
+        self.on_change = on_change
+        self.mode = None
+        self.events = 0
+        self.batches = 0
+        self._pending = set()
+        self._full_refresh = False
+        self._first_event_at = None
+        self._last_event_at = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._threads = []
+        # 監視スレッドを開始したプロセス
+        self._pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def start(self):
+        """監視を開始する"""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopped.clear()
+            self._start()
+
+    def ensure_started(self):
+        """このプロセスで監視を開始していなければ開始する（stop()で止めた場合を除く）"""
+        if self._pid == os.getpid() or self._stopped.is_set():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid() and not self._stopped.is_set():
+                self._start()
+
+    def _start(self):
+        self.catalog.get_files()
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._schedule_watches()
+                self._observer.start()
+                self.mode = 'watchdog'
+            except OSError as e:
+                print(f"Warning: Could not watch {self.catalog.docs_dir}: {e}")
+                self._observer = None
+
+        if self._observer is None:
+            self.mode = 'polling'
+            self._spawn(self._poll)
+        self._spawn(self._process)
+        self._pid = os.getpid()
+        self.catalog.watched = True
+
+    def _after_fork(self):
+        """
+        フォークした子プロセスでの初期化。
+        親プロセスの監視スレッドは存在しないため、カタログは自分で再検証するよう戻し、
+        親のスレッドが保持していたかもしれないロックも作り直します。
+        """
+        self.catalog.watched = False
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._pending = set()
+        self._full_refresh = False
+        self._first_event_at = self._last_event_at = None
+        self._observer = None
+        self._threads = []
+        self._pid = None
+        self.mode = None
+
+    def stop(self):
+        """監視を停止する（以降はカタログが自分で再検証する）"""
+        self.catalog.watched = False
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.mode = None
+
+    def notify(self, full_path):
+        """変更を記録する（Noneの場合は全体の再構築を要求する）"""
+        if full_path is not None and not full_path.endswith('.md'):
+            return
+        with self._condition:
+            now = time.monotonic()
+            if full_path is None:
+                self._full_refresh = True
+            else:
+                self._pending.add(os.path.normpath(full_path))
+            if self._first_event_at is None:
+                self._first_event_at = now
+            self._last_event_at = now
+            self.events += 1
+            self._condition.notify_all()
+
+    def stats(self):
+        """監視の状態を返す"""
+        with self._condition:
+            return {
+                'mode': self.mode,
+                'events': self.events,
+                'batches': self.batches,
+                'pending': len(self._pending)
+            }
+
+    def _schedule_watches(self):
+        """
+        除外ディレクトリ（node_modulesや.gitなど）を監視しないよう、
+        ルートは直下のみ、それ以外の直下のディレクトリは再帰的に監視する
+        """
+        docs_dir = self.catalog.docs_dir
+        handler = _EventHandler(self)
+        self._observer.unschedule_all()
+        self._observer.schedule(handler, docs_dir, recursive=False)
+        with os.scandir(docs_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and entry.name not in EXCLUDED_DIRS:
+                    self._observer.schedule(handler, entry.path, recursive=True)
+
+    def _spawn(self, target):
+        thread = threading.Thread(target=target, name=f'docs-watcher-{target.__name__}', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _take_batch(self):
+        """イベントが落ち着くまで待ってから、たまった変更を取り出す"""
+        with self._condition:
+            while not self._stopped.is_set():
+                if self._first_event_at is None:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                quiet_until = self._last_event_at + self.debounce
+                deadline = self._first_event_at + self.max_delay
+                if now >= quiet_until or now >= deadline:
+                    paths, full_refresh = self._pending, self._full_refresh
+                    self._pending, self._full_refresh = set(), False
+                    self._first_event_at = self._last_event_at = None
+                    self.batches += 1
+                    return paths, full_refresh
+                self._condition.wait(min(quiet_until, deadline) - now)
+        return None, False
+
+    def _process(self):
+        while True:
+            paths, full_refresh = self._take_batch()
+            if paths is None:
+                return
+            version = self.catalog.version
+            try:
+                if full_refresh and self._observer is not None:
+                    # ディレクトリの追加・削除に合わせて監視対象を更新
+                    self._schedule_watches()
+                if full_refresh or len(paths) > self.batch_limit:
+                    self.catalog.refresh(force=True)
+                else:
+                    self.catalog.apply_changes(sorted(paths))
+            except Exception as e:
+                print(f"Warning: Could not apply document changes: {e}")
+                continue
+            if self.on_change is not None and self.catalog.version != version:
+                self.on_change()
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_interval):
+            version = self.catalog.version
+            try:
+                self.catalog.refresh()
+            except Exception as e:
+                print(f"Warning: Could not poll document changes: {e}")
+                continue
+            if self.on_change is not None and self.catalog.version != version:
+                self.on_change()